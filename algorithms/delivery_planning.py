@@ -0,0 +1,87 @@
+"""
+Delivery planning for Smart Drone Delivery Planner.
+
+This module assigns packages to drone trips by repeatedly selecting the
+most valuable feasible load for each drone and planning its route.
+"""
+
+from .shortest_path import get_distance_matrix
+from .package_selection import knapsack_package_selection
+from .route_planning import get_detailed_route
+
+def plan_deliveries(city_map, packages, drones, warehouse_city_name):
+    """
+    Plan delivery trips for all drones until no more packages can be delivered.
+    
+    Drones are processed in order; each drone makes trips until none of the
+    remaining packages can be delivered by it.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        packages (list): List of Package objects to deliver
+        drones (list): List of Drone objects available for delivery
+        warehouse_city_name (str): Name of the warehouse city
+    
+    Returns:
+        tuple: (delivery_plans, undelivered_packages, errors) where:
+            - delivery_plans is a list of trip plan dictionaries with keys
+              'drone', 'packages', 'total_value', 'total_weight', 'route',
+              'detailed_route', 'segment_distances' and 'total_distance'
+            - undelivered_packages is a list of packages left undelivered
+            - errors is a list of messages for drones whose planning failed
+    """
+    delivery_plans = []
+    errors = []
+    
+    # Compute all-pairs shortest paths once up front; every trip's package
+    # selection, route and detailed route then reads segments from them
+    get_distance_matrix(city_map)
+    
+    # Track undelivered packages by ID, so delivered ones are removed
+    # in constant time and the selection reads a live view of the rest
+    remaining_packages = {package.id: package for package in packages}
+    
+    # Process each drone
+    for drone in drones:
+        # Continue planning trips until no more packages can be delivered
+        while remaining_packages:
+            try:
+                # Select packages for this trip
+                selected_packages, total_value, total_weight, route = knapsack_package_selection(
+                    remaining_packages.values(),
+                    drone.max_weight,
+                    city_map,
+                    drone.max_distance,
+                    warehouse_city_name
+                )
+                
+                if not selected_packages:
+                    # No feasible packages for this drone
+                    break
+                
+                # Get detailed route
+                detailed_route, segment_distances, total_distance = get_detailed_route(
+                    city_map,
+                    route
+                )
+            except Exception as e:
+                errors.append(str(e))
+                break
+            
+            # Create trip plan
+            delivery_plans.append({
+                'drone': drone,
+                'packages': selected_packages,
+                'total_value': total_value,
+                'total_weight': total_weight,
+                'route': route,
+                'detailed_route': detailed_route,
+                'segment_distances': segment_distances,
+                'total_distance': total_distance
+            })
+            
+            # Remove delivered packages
+            for package in selected_packages:
+                del remaining_packages[package.id]
+    
+    return delivery_plans, list(remaining_packages.values()), errors
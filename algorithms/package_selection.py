@@ -5,18 +5,26 @@ This module provides functions to select packages for drone delivery
 based on weight constraints and value optimization.
 """
 
-def knapsack_package_selection(packages, max_weight, city_map, drone_max_distance, warehouse_city_name):
+import math
+from array import array
+from itertools import accumulate
+
+def knapsack_package_selection(packages, max_weight, city_map, drone_max_distance, warehouse_city_name,
+                               *, scale=10):
     """
     Select packages for delivery to maximize value while respecting weight and distance constraints.
     
     This is a variation of the 0/1 Knapsack algorithm that also considers route feasibility.
     
     Args:
-        packages (list): List of Package objects to select from
+        packages (iterable): Package objects to select from; iterated once
         max_weight (float): Maximum weight capacity of the drone
         city_map (CityMap): The city map containing cities and routes
         drone_max_distance (float): Maximum flight distance of the drone
         warehouse_city_name (str): Name of the warehouse city
+        scale (int, optional): Weight units per kilogram used by the DP table.
+                               Coarser scales make the table smaller.
+                               Defaults to 10 (0.1 kg resolution).
         
     Returns:
         tuple: (selected_packages, total_value, total_weight, feasible_route) where:
@@ -25,12 +33,16 @@ def knapsack_package_selection(packages, max_weight, city_map, drone_max_distanc
             - total_weight is the sum of weights of selected packages
             - feasible_route is a list of city names representing the delivery route
     """
-    from .shortest_path import get_shortest_path
-    from .route_planning import plan_route
+    from .shortest_path import get_distance_matrix
+    from .route_planning import plan_route, _two_opt
     
-    # Group packages by destination city
+    # Group packages by destination city, leaving out packages heavier than
+    # the drone can carry; they could never be selected and would otherwise
+    # block the lighter packages after them in their destination's prefixes
     packages_by_destination = {}
     for package in packages:
+        if package.weight > max_weight:
+            continue
         if package.destination not in packages_by_destination:
             packages_by_destination[package.destination] = []
         packages_by_destination[package.destination].append(package)
@@ -39,48 +51,78 @@ def knapsack_package_selection(packages, max_weight, city_map, drone_max_distanc
     for destination, pkg_list in packages_by_destination.items():
         pkg_list.sort(key=lambda p: p.value / p.weight, reverse=True)
     
-    # Get all destinations
-    destinations = list(packages_by_destination.keys())
+    # Shortest distances from the warehouse to every destination
+    names, name_to_idx, dist, _ = get_distance_matrix(city_map)
+    warehouse = name_to_idx.get(warehouse_city_name)
+    warehouse_distance = {}
     
-    # Initialize dynamic programming table
-    # dp[i][w] = (value, packages, route) for considering first i destinations with weight limit w
-    n = len(destinations)
-    w_max = int(max_weight * 10)  # Scale up for integer weights
-    dp = [[(0, [], None) for _ in range(w_max + 1)] for _ in range(n + 1)]
+    # Keep only destinations the drone can reach and return from; a
+    # destination more than half the drone's range away can never be visited
+    if warehouse is not None:
+        warehouse_row = dist[warehouse]
+        for destination in packages_by_destination:
+            idx = name_to_idx.get(destination)
+            if idx is not None and 2 * warehouse_row[idx] <= drone_max_distance:
+                warehouse_distance[destination] = warehouse_row[idx]
     
-    # Fill the dp table
-    for i in range(1, n + 1):
-        destination = destinations[i-1]
+    # Get all destinations
+    destinations = list(warehouse_distance)
+    
+    # Read package weights and values once into per-destination columns, so
+    # the rest of the selection works on plain numbers
+    weights = []
+    values = []
+    for destination in destinations:
         dest_packages = packages_by_destination[destination]
+        weights.append([p.weight for p in dest_packages])
+        values.append([p.value for p in dest_packages])
+    
+    # Prefix sums per destination: taking the first k packages from destination i
+    # weighs pref_kg[i][k] kilograms (pref_w[i][k] scaled to integers) and is
+    # worth pref_v[i][k]
+    # Weights are rounded up and the capacity down, so a selection can never
+    # exceed the drone's capacity; the tolerance absorbs float noise
+    pref_kg = [[0] + list(accumulate(dest_weights)) for dest_weights in weights]
+    pref_w = [[math.ceil(w * scale - 1e-9) for w in dest_kg] for dest_kg in pref_kg]
+    pref_v = [[0] + list(accumulate(dest_values)) for dest_values in values]
+    
+    w_max = math.floor(max_weight * scale + 1e-9)  # Scale up for integer weights
+    
+    # Number of packages to take from each destination
+    if (sum(dest_w[-1] for dest_w in pref_w) <= w_max
+            and all(value > 0 for dest_values in values for value in dest_values)):
+        # Every reachable package fits, so the best load is all of them and
+        # the dp table is not needed
+        counts = [len(dest_w) - 1 for dest_w in pref_w]
+    else:
+        # Fill the dp table
+        best, choices = _knapsack_fill(pref_w, pref_v, w_max)
         
-        for w in range(1, w_max + 1):
-            # Default: don't include any package from this destination
-            dp[i][w] = dp[i-1][w]
-            
-            # Try including packages from this destination
-            for k in range(len(dest_packages) + 1):
-                # Take first k packages from this destination
-                selected = dest_packages[:k]
-                total_weight = sum(p.weight for p in selected)
-                scaled_weight = int(total_weight * 10)
-                
-                if scaled_weight <= w:
-                    prev_value, prev_packages, _ = dp[i-1][w - scaled_weight]
-                    current_value = prev_value + sum(p.value for p in selected)
-                    
-                    if current_value > dp[i][w][0]:
-                        dp[i][w] = (current_value, prev_packages + selected, None)
-    
-    # Get the optimal solution
-    best_value, selected_packages, _ = dp[n][w_max]
-    total_weight = sum(p.weight for p in selected_packages)
+        # Get the optimal solution by walking the choices backwards
+        counts = [0] * len(destinations)
+        w = w_max
+        for i in range(len(destinations) - 1, -1, -1):
+            k = choices[i][w]
+            counts[i] = k
+            w -= pref_w[i][k]
+    
+    best_value = sum(dest_v[k] for dest_v, k in zip(pref_v, counts))
+    selected_groups = []
+    total_weight = 0
+    for i in range(len(destinations) - 1, -1, -1):
+        k = counts[i]
+        if k:
+            selected_groups.append(packages_by_destination[destinations[i]][:k])
+            total_weight += pref_kg[i][k]
+    
+    selected_packages = [p for group in reversed(selected_groups) for p in group]
     
     # If no packages were selected, return empty result
     if not selected_packages:
         return [], 0, 0, []
     
     # Get unique destinations of selected packages
-    selected_destinations = set(p.destination for p in selected_packages)
+    selected_destinations = dict.fromkeys(p.destination for p in selected_packages)
     
     # Plan a feasible route through these destinations
     try:
@@ -104,42 +146,90 @@ def knapsack_package_selection(packages, max_weight, city_map, drone_max_distanc
     total_weight = 0
     
     # Sort destinations by shortest distance from warehouse
-    from .shortest_path import get_shortest_path
-    destinations_with_distance = []
-    
-    for dest in destinations:
-        try:
-            _, distance = get_shortest_path(city_map, warehouse_city_name, dest)
-            destinations_with_distance.append((dest, distance))
-        except ValueError:
-            # Skip unreachable destinations
-            continue
-    
-    destinations_with_distance.sort(key=lambda x: x[1])
+    destinations_with_distance = sorted(enumerate(destinations),
+                                        key=lambda x: warehouse_distance[x[1]])
     
-    # Try adding packages from closest destinations first
-    route = [warehouse_city_name]
-    current_route_distance = 0
+    # Try adding packages from closest destinations first, growing the tour
+    # by cheapest insertion instead of re-planning it for every candidate
+    tour = [warehouse, warehouse]
+    tour_distance = 0
     
-    for dest, _ in destinations_with_distance:
-        # Check if we can add this destination to the route
-        temp_route = route + [dest, warehouse_city_name]
-        try:
-            temp_route, temp_distance = plan_route(city_map, warehouse_city_name, [d for d in temp_route if d != warehouse_city_name])
+    for i_dest, dest in destinations_with_distance:
+        d = name_to_idx[dest]
+        dest_row = dist[d]
+        
+        # Find the cheapest place to insert this destination into the tour
+        best_delta = float('infinity')
+        best_position = 0
+        for i in range(len(tour) - 1):
+            a, b = tour[i], tour[i+1]
+            delta = dest_row[a] + dest_row[b] - dist[a][b]
+            if delta < best_delta:
+                best_delta = delta
+                best_position = i + 1
+        
+        if tour_distance + best_delta <= drone_max_distance:
+            # We can add this destination
+            tour.insert(best_position, d)
+            tour = _two_opt(tour, dist)
+            tour_distance = sum(dist[tour[i]][tour[i+1]] for i in range(len(tour) - 1))
             
-            if temp_distance <= drone_max_distance:
-                # We can add this destination
-                route = temp_route
-                current_route_distance = temp_distance
-                
-                # Add packages from this destination, sorted by value-to-weight ratio
-                for package in packages_by_destination[dest]:
-                    if total_weight + package.weight <= max_weight:
-                        selected_packages.append(package)
-                        total_value += package.value
-                        total_weight += package.weight
-        except ValueError:
-            # Skip if no feasible route
-            continue
+            # Add packages from this destination, sorted by value-to-weight ratio
+            for package, weight, value in zip(packages_by_destination[dest],
+                                              weights[i_dest], values[i_dest]):
+                if total_weight + weight <= max_weight:
+                    selected_packages.append(package)
+                    total_value += value
+                    total_weight += weight
+    
+    route = [names[i] for i in tour] if len(tour) > 2 else [warehouse_city_name]
     
     return selected_packages, total_value, total_weight, route
+
+
+def _knapsack_fill(pref_w, pref_v, w_max):
+    """
+    Fill the grouped knapsack table over destinations.
+    
+    Works only on integer weights and numeric values, without touching
+    Package objects.
+    
+    Args:
+        pref_w (list): Per destination, scaled weight of taking its first k packages
+        pref_v (list): Per destination, value of taking its first k packages
+        w_max (int): Scaled weight capacity
+        
+    Returns:
+        tuple: (best, choices) where:
+            - best[w] is the best value achievable with weight limit w
+            - choices[i][w] is the number of packages taken from destination i
+              in the best solution for weight limit w over destinations 0..i
+    """
+    # Single rolling row of best values; choices are kept as compact
+    # unsigned int arrays rather than lists of Python objects
+    size = w_max + 1
+    best = [0] * size
+    choices = []
+    
+    for dest_w, dest_v in zip(pref_w, pref_v):
+        # Default: don't include any package from this destination
+        previous = best[:]
+        choice = array('I', [0]) * size
+        
+        # Try each package count k as one sweep over the whole row, reading
+        # the previous destination's values from a snapshot of the row
+        for k in range(1, len(dest_w)):
+            scaled_weight = dest_w[k]
+            if scaled_weight > w_max:
+                # Prefix weights only grow with k
+                break
+            
+            value_k = dest_v[k]
+            for w, current_value in enumerate(previous[:size - scaled_weight], scaled_weight):
+                current_value += value_k
+                if current_value > best[w]:
+                    best[w] = current_value
+                    choice[w] = k
+        choices.append(choice)
+    
+    return best, choices
@@ -5,16 +5,26 @@ This module provides functions to plan efficient delivery routes
 through multiple cities while minimizing total distance.
 """
 
-from itertools import permutations
-from .shortest_path import get_shortest_path
+from .shortest_path import get_distance_matrix, get_distance_rows, _segment
+
+# Largest number of destinations solved exactly; larger sets use a heuristic
+MAX_EXACT_DESTINATIONS = 10
+
+# Maps with at most this many cities get the full all-pairs distance matrix,
+# which later routes on the same map reuse; on larger maps it is computed only
+# when the route's cities make up a large share of the map
+ALL_PAIRS_MAX_CITIES = 100
+ALL_PAIRS_MIN_SHARE = 0.25
 
 def plan_route(city_map, warehouse_city_name, destination_cities):
     """
     Plan an efficient route starting and ending at the warehouse and visiting all destination cities.
     
-    This function uses a simple approach for small numbers of destinations:
-    - For 1-3 destinations: Try all possible permutations to find the optimal route
-    - For more destinations: Use a greedy nearest-neighbor approach
+    This function uses an exact approach for small numbers of destinations:
+    - For up to MAX_EXACT_DESTINATIONS destinations: Find the optimal route
+      with the Held-Karp dynamic programming algorithm
+    - For more destinations: Use a greedy nearest-neighbor approach improved
+      with 2-opt moves
     
     Args:
         city_map (CityMap): The city map containing cities and routes
@@ -29,8 +39,9 @@ def plan_route(city_map, warehouse_city_name, destination_cities):
     Raises:
         ValueError: If any city does not exist in the map or if no feasible route exists
     """
-    # Remove duplicates and warehouse from destination list if present
-    unique_destinations = list(set(destination_cities))
+    # Remove duplicates and warehouse from destination list if present,
+    # keeping the order the destinations were given in
+    unique_destinations = list(dict.fromkeys(destination_cities))
     if warehouse_city_name in unique_destinations:
         unique_destinations.remove(warehouse_city_name)
     
@@ -38,122 +49,219 @@ def plan_route(city_map, warehouse_city_name, destination_cities):
     if not unique_destinations:
         return [warehouse_city_name], 0
     
-    # Check if all cities exist in the map
+    # The best tour does not depend on the order destinations were given in,
+    # so reuse any route already planned for this set on the current map
+    cache_key = (warehouse_city_name, frozenset(unique_destinations))
+    cached = city_map._route_cache.get(cache_key)
+    if cached is not None:
+        return list(cached[0]), cached[1]
+    
+    # Translate city names to the integer indices the planners work on,
+    # checking that all cities exist in the map; the lookup table is built
+    # once per map
+    name_to_idx = city_map.build_csr()[1]
+    indices = []
     for city in unique_destinations + [warehouse_city_name]:
-        if city not in city_map.cities:
+        idx = name_to_idx.get(city)
+        if idx is None:
             raise ValueError(f"City '{city}' does not exist in the map")
+        indices.append(idx)
+    warehouse = indices.pop()
+    destinations = indices
+    
+    # Shortest distances from the warehouse and destinations. On small maps
+    # all pairs are computed once; on large ones only the rows needed here
+    names = city_map.build_csr()[0]
+    sources = destinations + [warehouse]
+    if (len(names) <= ALL_PAIRS_MAX_CITIES
+            or len(sources) >= ALL_PAIRS_MIN_SHARE * len(names)):
+        dist = get_distance_matrix(city_map)[2]
+    else:
+        dist = get_distance_rows(city_map, sources)
     
-    # For small number of destinations, try all permutations
-    if len(unique_destinations) <= 3:
-        return _find_optimal_route(city_map, warehouse_city_name, unique_destinations)
+    # For small number of destinations, solve exactly
+    if len(destinations) <= MAX_EXACT_DESTINATIONS:
+        route, total_distance = _find_optimal_route(dist, warehouse, destinations)
     else:
-        return _find_greedy_route(city_map, warehouse_city_name, unique_destinations)
+        route, total_distance = _find_greedy_route(dist, warehouse, destinations)
+    
+    route = [names[i] for i in route]
+    city_map._route_cache[cache_key] = (route, total_distance)
+    
+    return list(route), total_distance
 
-def _find_optimal_route(city_map, warehouse_city_name, destinations):
+def _find_optimal_route(dist, warehouse, destinations):
     """
-    Find the optimal route by trying all permutations of destinations.
+    Find the optimal route using the Held-Karp dynamic programming algorithm.
+    
+    Runs in O(2^n * n^2) time for n destinations, instead of trying all n!
+    orderings. Partial routes that cannot beat the heuristic tour, even
+    when returning straight to the warehouse, are pruned.
     
     Args:
-        city_map (CityMap): The city map containing cities and routes
-        warehouse_city_name (str): Name of the warehouse city
-        destinations (list): List of destination city names to visit
+        dist (list or dict): Shortest distances dist[a][b] by city index; rows
+                             are needed for the warehouse and destinations
+        warehouse (int): Index of the warehouse city
+        destinations (list): List of destination city indices to visit
         
     Returns:
-        tuple: (route, total_distance)
+        tuple: (route, total_distance) with the route as city indices
         
     Raises:
         ValueError: If no feasible route exists
     """
-    best_route = None
-    best_distance = float('infinity')
-    
-    # Try all permutations of destinations
-    for perm in permutations(destinations):
-        # Construct route: warehouse -> destinations -> warehouse
-        route = [warehouse_city_name]
-        route.extend(perm)
-        route.append(warehouse_city_name)
-        
-        # Calculate total distance
-        total_distance = 0
-        valid_route = True
-        
-        for i in range(len(route) - 1):
-            try:
-                _, segment_distance = get_shortest_path(city_map, route[i], route[i+1])
-                total_distance += segment_distance
-            except ValueError:
-                # No path exists between these cities
-                valid_route = False
-                break
-        
-        # Update best route if this one is better
-        if valid_route and total_distance < best_distance:
-            best_route = route
+    inf = float('infinity')
+    n = len(destinations)
+    full = (1 << n) - 1
+    
+    # Local distance matrix; index n is the warehouse
+    nodes = list(destinations) + [warehouse]
+    d = [[dist[a][b] for b in nodes] for a in nodes]
+    
+    # Branch and bound: the heuristic tour bounds the optimum, and any partial
+    # route still has to return to the warehouse, so partial routes whose
+    # distance plus the way back exceeds the bound are never extended
+    try:
+        _, bound = _find_greedy_route(dist, warehouse, destinations)
+    except ValueError:
+        bound = inf
+    limit = bound + 1e-9 * (1 + bound)
+    to_warehouse = [d[k][n] for k in range(n)]
+    
+    # cost[mask][j] = shortest distance leaving the warehouse, visiting exactly
+    # the destinations in mask and ending at destination j
+    cost = [[inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n):
+        cost[1 << j][j] = d[n][j]
+    
+    for mask in range(1, full + 1):
+        row = cost[mask]
+        for j in range(n):
+            current = row[j]
+            if current == inf:
+                continue
+            
+            # Extend the partial route to every unvisited destination
+            d_j = d[j]
+            for k in range(n):
+                bit = 1 << k
+                if mask & bit:
+                    continue
+                
+                candidate = current + d_j[k]
+                if candidate + to_warehouse[k] > limit:
+                    continue
+                
+                next_mask = mask | bit
+                if candidate < cost[next_mask][k]:
+                    cost[next_mask][k] = candidate
+                    parent[next_mask][k] = j
+    
+    # Close the tour back at the warehouse
+    best_distance = inf
+    last = -1
+    for j in range(n):
+        total_distance = cost[full][j] + d[j][n]
+        if total_distance < best_distance:
             best_distance = total_distance
+            last = j
     
     # Check if a valid route was found
-    if best_route is None:
+    if last < 0:
         raise ValueError("No feasible route exists through all destinations")
     
-    return best_route, best_distance
+    # Reconstruct the visiting order from the parent table
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(nodes[last])
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    order.reverse()
+    
+    return [warehouse] + order + [warehouse], best_distance
 
-def _find_greedy_route(city_map, warehouse_city_name, destinations):
+def _find_greedy_route(dist, warehouse, destinations):
     """
-    Find a route using a greedy nearest-neighbor approach.
+    Find a route using a greedy nearest-neighbor approach followed by 2-opt.
     
     Args:
-        city_map (CityMap): The city map containing cities and routes
-        warehouse_city_name (str): Name of the warehouse city
-        destinations (list): List of destination city names to visit
+        dist (list or dict): Shortest distances dist[a][b] by city index; rows
+                             are needed for the warehouse and destinations
+        warehouse (int): Index of the warehouse city
+        destinations (list): List of destination city indices to visit
         
     Returns:
-        tuple: (route, total_distance)
+        tuple: (route, total_distance) with the route as city indices
         
     Raises:
         ValueError: If no feasible route exists
     """
     # Start at the warehouse
-    route = [warehouse_city_name]
-    remaining = set(destinations)
-    total_distance = 0
+    route = [warehouse]
+    remaining = list(destinations)
     
     # While there are destinations to visit
     while remaining:
-        current = route[-1]
-        next_city = None
-        min_distance = float('infinity')
+        current_row = dist[route[-1]]
         
         # Find the closest unvisited destination
-        for dest in remaining:
-            try:
-                _, distance = get_shortest_path(city_map, current, dest)
-                if distance < min_distance:
-                    min_distance = distance
-                    next_city = dest
-            except ValueError:
-                # No path exists to this destination
-                continue
+        next_city = min(remaining, key=current_row.__getitem__)
         
         # If no reachable destination was found
-        if next_city is None:
+        if current_row[next_city] == float('infinity'):
             raise ValueError("No feasible route exists through all destinations")
         
         # Add the next city to the route
         route.append(next_city)
         remaining.remove(next_city)
-        total_distance += min_distance
     
     # Return to the warehouse
-    try:
-        _, return_distance = get_shortest_path(city_map, route[-1], warehouse_city_name)
-        route.append(warehouse_city_name)
-        total_distance += return_distance
-    except ValueError:
+    if dist[route[-1]][warehouse] == float('infinity'):
         raise ValueError("No feasible route exists back to the warehouse")
+    route.append(warehouse)
+    
+    # Remove crossings left by the greedy construction
+    route = _two_opt(route, dist)
+    total_distance = sum(dist[route[i]][route[i+1]] for i in range(len(route) - 1))
     
     return route, total_distance
 
+def _two_opt(route, dist):
+    """
+    Improve a closed route with 2-opt moves until no move shortens it.
+    
+    Each move reverses the segment route[i..j] when reconnecting its ends
+    the other way round is shorter. The first and last cities stay fixed.
+    
+    Args:
+        route (list): List of city indices starting and ending at the warehouse
+        dist (list or dict): Shortest distances dist[a][b] by city index; rows
+                             are needed for the warehouse and destinations
+        
+    Returns:
+        list: The improved route
+    """
+    route = list(route)
+    improved = True
+    
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 2):
+            a, b = route[i-1], route[i]
+            for j in range(i + 1, len(route) - 1):
+                c, d = route[j], route[j+1]
+                
+                # Routes are bidirectional, so reversing the segment only
+                # changes the two edges at its ends
+                delta = dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d]
+                if delta < -1e-9:
+                    route[i:j+1] = reversed(route[i:j+1])
+                    b = route[i]
+                    improved = True
+    
+    return route
+
 def get_detailed_route(city_map, route):
     """
     Get a detailed route with all intermediate cities and segment distances.
@@ -176,8 +284,8 @@ def get_detailed_route(city_map, route):
     total_distance = 0
     
     for i in range(len(route) - 1):
-        # Get the shortest path for this segment
-        segment_path, segment_distance = get_shortest_path(city_map, route[i], route[i+1])
+        # Get the cached shortest path for this segment without copying it
+        segment_path, segment_distance = _segment(city_map, route[i], route[i+1])
         
         # Add intermediate cities (skip the first as it's already in the route)
         detailed_route.extend(segment_path[1:])
@@ -6,7 +6,183 @@ in the city map using Dijkstra's algorithm.
 """
 
 import heapq
-from collections import defaultdict
+
+def _dijkstra_csr(indptr, indices, weights, start_idx, n, target_idx=-1):
+    """
+    Run Dijkstra's algorithm on a compressed sparse row graph.
+    
+    Args:
+        indptr (list): Row offsets; neighbors of i are indices[indptr[i]:indptr[i+1]]
+        indices (list): Neighbor city indices
+        weights (list): Route distances matching indices
+        start_idx (int): Index of the starting city
+        n (int): Number of cities
+        target_idx (int, optional): Stop as soon as this city is settled.
+                                    Defaults to -1 (search the whole graph).
+        
+    Returns:
+        tuple: (dist, pred) lists indexed by city, with infinity for
+               unreachable cities and -1 for cities without a predecessor
+    """
+    inf = float('infinity')
+    dist = [inf] * n
+    pred = [-1] * n
+    visited = [False] * n
+    dist[start_idx] = 0
+    
+    # Priority queue for cities to visit (distance, city_index). Stale entries
+    # are skipped when popped: an indexed heap with decrease-key avoids them,
+    # but written in Python it runs about twice as slow as the C heapq module.
+    pq = [(0, start_idx)]
+    remaining = n
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    
+    while pq:
+        current_distance, u = heappop(pq)
+        if visited[u]:
+            continue
+        visited[u] = True
+        
+        # The target's distance is final once it is popped
+        if u == target_idx:
+            break
+        
+        # If we've visited all cities, we can stop
+        remaining -= 1
+        if remaining == 0:
+            break
+        
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if visited[v]:
+                continue
+            
+            distance = current_distance + weights[e]
+            if distance < dist[v]:
+                dist[v] = distance
+                pred[v] = u
+                heappush(pq, (distance, v))
+    
+    return dist, pred
+
+# Dial's algorithm scans one bucket per unit of distance, so it only beats the
+# heap when the longest route is short compared with the size of the graph:
+# it is used when max_step * DIAL_SIZE_RATIO <= cities + route directions
+DIAL_SIZE_RATIO = 10
+
+def _dijkstra_dial(indptr, indices, weights, steps, start_idx, n, max_step, target_idx=-1):
+    """
+    Run Dial's algorithm on a compressed sparse row graph with integer weights.
+    
+    Cities are kept in buckets indexed by tentative distance. Since no route
+    is longer than max_step, max_step + 1 buckets used circularly are enough.
+    Distances are summed from the original weights, so the results match
+    _dijkstra_csr() in value and type.
+    
+    Args:
+        indptr (list): Row offsets; neighbors of i are indices[indptr[i]:indptr[i+1]]
+        indices (list): Neighbor city indices
+        weights (list): Whole-number route distances matching indices
+        steps (list): The same distances as ints, used as bucket offsets
+        start_idx (int): Index of the starting city
+        n (int): Number of cities
+        max_step (int): Largest value in steps
+        target_idx (int, optional): Stop as soon as this city is settled.
+                                    Defaults to -1 (search the whole graph).
+        
+    Returns:
+        tuple: (dist, pred) as returned by _dijkstra_csr()
+    """
+    inf = float('infinity')
+    dist = [inf] * n
+    pred = [-1] * n
+    visited = [False] * n
+    dist[start_idx] = 0
+    
+    size = max_step + 1
+    buckets = [[] for _ in range(size)]
+    buckets[0].append(start_idx)
+    pending = 1
+    current_distance = 0
+    
+    while pending:
+        bucket = buckets[current_distance % size]
+        if not bucket:
+            current_distance += 1
+            continue
+        
+        u = bucket.pop()
+        pending -= 1
+        # Skip stale entries left behind by a later improvement
+        if visited[u] or dist[u] != current_distance:
+            continue
+        visited[u] = True
+        
+        # The target's distance is final once it is popped
+        if u == target_idx:
+            break
+        
+        dist_u = dist[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            if visited[v]:
+                continue
+            
+            distance = dist_u + weights[e]
+            if distance < dist[v]:
+                dist[v] = distance
+                pred[v] = u
+                buckets[(current_distance + steps[e]) % size].append(v)
+                pending += 1
+    
+    return dist, pred
+
+def _dial_steps(city_map):
+    """
+    Return integer route distances for Dial's algorithm, if the map allows it.
+    
+    The check runs once per map version: Dial's algorithm is used only when
+    every route distance is a non-negative whole number and the largest is
+    small for the size of the map (see DIAL_SIZE_RATIO).
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        
+    Returns:
+        tuple: (steps, max_step), or None if the heap-based search must be used
+    """
+    if city_map._dial_steps is None:
+        names, _, _, indices, weights = city_map.build_csr()
+        max_weight = (len(names) + len(indices)) / DIAL_SIZE_RATIO
+        city_map._dial_steps = False
+        
+        if all(isinstance(w, (int, float)) and 0 <= w <= max_weight and w == int(w)
+               for w in weights):
+            steps = [int(w) for w in weights]
+            city_map._dial_steps = (steps, max(steps, default=0))
+    
+    return city_map._dial_steps or None
+
+def _search(city_map, start_idx, target_idx=-1):
+    """
+    Run the fastest applicable single-source search on the city map.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        start_idx (int): Index of the starting city
+        target_idx (int, optional): Stop as soon as this city is settled.
+                                    Defaults to -1 (search the whole graph).
+        
+    Returns:
+        tuple: (dist, pred) lists indexed by city
+    """
+    names, _, indptr, indices, weights = city_map.build_csr()
+    dial = _dial_steps(city_map)
+    if dial is not None:
+        steps, max_step = dial
+        return _dijkstra_dial(indptr, indices, weights, steps, start_idx, len(names), max_step, target_idx)
+    return _dijkstra_csr(indptr, indices, weights, start_idx, len(names), target_idx)
 
 def dijkstra(city_map, start_city_name):
     """
@@ -27,51 +203,80 @@ def dijkstra(city_map, start_city_name):
     if start_city_name not in city_map.cities:
         raise ValueError(f"City '{start_city_name}' does not exist in the map")
     
-    # Initialize distances with infinity for all cities except the start city
-    distances = {city_name: float('infinity') for city_name in city_map.cities}
-    distances[start_city_name] = 0
+    # Work on integer city indices and translate back to names at the end
+    names, name_to_idx = city_map.build_csr()[:2]
+    dist, pred = _search(city_map, name_to_idx[start_city_name])
     
-    # Initialize predecessors dictionary
-    predecessors = {city_name: None for city_name in city_map.cities}
+    distances = dict(zip(names, dist))
+    predecessors = {name: (names[p] if p >= 0 else None) for name, p in zip(names, pred)}
     
-    # Priority queue for cities to visit (distance, city_name)
-    pq = [(0, start_city_name)]
+    return distances, predecessors
+
+def _cached_dijkstra(city_map, start_city_name):
+    """
+    Return Dijkstra results for a start city, reusing earlier runs on the same map.
     
-    # Set to keep track of visited cities
-    visited = set()
+    Results are stored on the city map and discarded whenever the map changes,
+    so all queries sharing a source city reuse a single Dijkstra run.
+    The returned dictionaries are shared and must not be modified.
     
-    while pq:
-        # Get city with smallest distance
-        current_distance, current_city = heapq.heappop(pq)
-        
-        # Skip if already visited
-        if current_city in visited:
-            continue
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        start_city_name (str): The name of the starting city
         
-        # Mark as visited
-        visited.add(current_city)
+    Returns:
+        tuple: (distances, predecessors) as returned by dijkstra()
+    """
+    cache = city_map._dijkstra_cache
+    result = cache.get(start_city_name)
+    if result is None:
+        result = dijkstra(city_map, start_city_name)
+        cache[start_city_name] = result
+    return result
+
+def dijkstra_to(city_map, start_city_name, end_city_name):
+    """
+    Find the shortest path between two cities, stopping once the end city is reached.
+    
+    Unlike dijkstra(), the search does not expand the rest of the graph after
+    the end city's distance is known.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        start_city_name (str): The name of the starting city
+        end_city_name (str): The name of the destination city
         
-        # If we've visited all cities, we can stop
-        if len(visited) == len(city_map.cities):
-            break
+    Returns:
+        tuple: (path, distance) as returned by get_shortest_path()
         
-        # Check all neighbors
-        for neighbor, weight in city_map.get_neighbors(current_city).items():
-            if neighbor in visited:
-                continue
-                
-            # Calculate new distance
-            distance = current_distance + weight
-            
-            # If we found a shorter path, update distance and predecessor
-            if distance < distances[neighbor]:
-                distances[neighbor] = distance
-                predecessors[neighbor] = current_city
-                heapq.heappush(pq, (distance, neighbor))
+    Raises:
+        ValueError: If either city does not exist in the map or if no path exists
+    """
+    if start_city_name not in city_map.cities:
+        raise ValueError(f"City '{start_city_name}' does not exist in the map")
+    if end_city_name not in city_map.cities:
+        raise ValueError(f"City '{end_city_name}' does not exist in the map")
     
-    return distances, predecessors
+    names, name_to_idx = city_map.build_csr()[:2]
+    end_idx = name_to_idx[end_city_name]
+    dist, pred = _search(city_map, name_to_idx[start_city_name], end_idx)
+    
+    if dist[end_idx] == float('infinity'):
+        raise ValueError(f"No path exists from '{start_city_name}' to '{end_city_name}'")
+    
+    # Reconstruct the path
+    path = []
+    current = end_idx
+    
+    while current >= 0:
+        path.append(names[current])
+        current = pred[current]
+    
+    path.reverse()
+    
+    return path, dist[end_idx]
 
-def get_shortest_path(city_map, start_city_name, end_city_name):
+def get_shortest_path(city_map, start_city_name, end_city_name, closed_routes=()):
     """
     Find the shortest path between two cities.
     
@@ -79,12 +284,43 @@ def get_shortest_path(city_map, start_city_name, end_city_name):
         city_map (CityMap): The city map containing cities and routes
         start_city_name (str): The name of the starting city
         end_city_name (str): The name of the destination city
+        closed_routes (iterable, optional): (city1_name, city2_name) pairs of
+                                            routes the path may not use, e.g.
+                                            routes closed for a while without
+                                            being removed from the map.
+                                            Defaults to no closed routes.
         
     Returns:
         tuple: (path, distance) where:
             - path is a list of city names representing the shortest path
             - distance is the total distance of the path
             
+    Raises:
+        ValueError: If either city does not exist in the map or if no path exists
+    """
+    closed = frozenset(city_map.edge_key(*route) for route in closed_routes)
+    path, distance = _segment(city_map, start_city_name, end_city_name, closed)
+    return list(path), distance
+
+def _segment(city_map, start_city_name, end_city_name, closed=frozenset()):
+    """
+    Find the shortest path between two cities as a tuple of city names.
+    
+    Segments are cached on the map once per undirected city pair (and set of
+    closed routes) until the map changes; the opposite direction is served by
+    reversing the path.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        start_city_name (str): The name of the starting city
+        end_city_name (str): The name of the destination city
+        closed (frozenset, optional): (city1_name, city2_name) pairs, as
+                                      built by CityMap.edge_key(), of routes
+                                      the path may not use
+        
+    Returns:
+        tuple: (path, distance) where path is a tuple of city names
+            
     Raises:
         ValueError: If either city does not exist in the map or if no path exists
     """
@@ -95,27 +331,119 @@ def get_shortest_path(city_map, start_city_name, end_city_name):
     
     # If start and end are the same, return a path with just that city
     if start_city_name == end_city_name:
-        return [start_city_name], 0
+        return (start_city_name,), 0
+    
+    # Routes are bidirectional, so each pair is stored under its sorted key
+    key = city_map.edge_key(start_city_name, end_city_name)
+    forward = key[0] == start_city_name
+    if closed:
+        key += (closed,)
+    segment_cache = city_map._segment_cache
+    segment = segment_cache.get(key)
+    if segment is not None:
+        if forward:
+            return segment
+        return segment[0][::-1], segment[1]
+    
+    # Prefer the all-pairs matrices or a full search from this start city
+    # if either is cached, otherwise search only until the end city is reached
+    all_pairs = city_map._all_pairs_indexed
+    cached = city_map._dijkstra_cache.get(start_city_name)
+    if closed:
+        # Cached results may use the closed routes, so search again
+        path, distance = _dijkstra_avoiding(city_map, start_city_name, end_city_name, closed)
+    elif all_pairs is not None:
+        names, name_to_idx, dist, toward = all_pairs
+        start_idx = name_to_idx[start_city_name]
+        end_idx = name_to_idx[end_city_name]
+        distance = dist[start_idx][end_idx]
+        
+        if distance == float('infinity'):
+            raise ValueError(f"No path exists from '{start_city_name}' to '{end_city_name}'")
+        
+        # Follow next hops towards the end city
+        hops = toward[end_idx]
+        path = [start_city_name]
+        current = start_idx
+        while current != end_idx:
+            current = hops[current]
+            path.append(names[current])
+    elif cached is None:
+        path, distance = dijkstra_to(city_map, start_city_name, end_city_name)
+    else:
+        distances, predecessors = cached
+        distance = distances[end_city_name]
+        
+        # Check if a path exists
+        if distance == float('infinity'):
+            raise ValueError(f"No path exists from '{start_city_name}' to '{end_city_name}'")
+        
+        # Reconstruct the path
+        path = []
+        current = end_city_name
+        
+        while current is not None:
+            path.append(current)
+            current = predecessors[current]
+        
+        # Reverse the path to get it from start to end
+        path.reverse()
+    
+    path = tuple(path)
+    segment_cache[key] = (path, distance) if forward else (path[::-1], distance)
+    
+    return path, distance
+
+def _dijkstra_avoiding(city_map, start_city_name, end_city_name, closed):
+    """
+    Find the shortest path between two cities without using the closed routes.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        start_city_name (str): The name of the starting city
+        end_city_name (str): The name of the destination city
+        closed (frozenset): (city1_name, city2_name) pairs of routes to avoid
+        
+    Returns:
+        tuple: (path, distance) as returned by get_shortest_path()
+        
+    Raises:
+        ValueError: If no path exists
+    """
+    names, name_to_idx, indptr, indices, weights = city_map.build_csr()
+    
+    # Closed routes get an infinite distance in both directions, so the
+    # search never relaxes along them
+    inf = float('infinity')
+    weights = list(weights)
+    for city1_name, city2_name in closed:
+        i = name_to_idx.get(city1_name)
+        j = name_to_idx.get(city2_name)
+        if i is None or j is None:
+            continue
+        for u, v in ((i, j), (j, i)):
+            for e in range(indptr[u], indptr[u + 1]):
+                if indices[e] == v:
+                    weights[e] = inf
     
-    # Run Dijkstra's algorithm
-    distances, predecessors = dijkstra(city_map, start_city_name)
+    end_idx = name_to_idx[end_city_name]
+    dist, pred = _dijkstra_csr(indptr, indices, weights, name_to_idx[start_city_name],
+                               len(names), end_idx)
     
-    # Check if a path exists
-    if distances[end_city_name] == float('infinity'):
+    if dist[end_idx] == inf:
         raise ValueError(f"No path exists from '{start_city_name}' to '{end_city_name}'")
     
     # Reconstruct the path
     path = []
-    current = end_city_name
+    current = end_idx
     
-    while current is not None:
-        path.append(current)
-        current = predecessors[current]
+    while current >= 0:
+        path.append(names[current])
+        current = pred[current]
     
-    # Reverse the path to get it from start to end
     path.reverse()
     
-    return path, distances[end_city_name]
+    return path, dist[end_idx]
 
 def get_all_shortest_paths(city_map, start_city_name):
     """
@@ -134,8 +462,35 @@ def get_all_shortest_paths(city_map, start_city_name):
     if start_city_name not in city_map.cities:
         raise ValueError(f"City '{start_city_name}' does not exist in the map")
     
-    # Run Dijkstra's algorithm
-    distances, predecessors = dijkstra(city_map, start_city_name)
+    # Once the all-pairs matrices exist, the shortest-path tree rooted at the
+    # start city is one of their rows
+    if city_map._all_pairs_indexed is not None:
+        names, name_to_idx, dist, toward = city_map._all_pairs_indexed
+        start_idx = name_to_idx[start_city_name]
+        pred = toward[start_idx]
+        paths = {}
+        
+        for end_idx, distance in enumerate(dist[start_idx]):
+            # Skip unreachable cities
+            if distance == float('infinity'):
+                continue
+            
+            # Reconstruct the path
+            path = []
+            current = end_idx
+            
+            while current >= 0:
+                path.append(names[current])
+                current = pred[current]
+            
+            path.reverse()
+            
+            paths[names[end_idx]] = (path, distance)
+        
+        return paths
+    
+    # Run Dijkstra's algorithm (cached per start city)
+    distances, predecessors = _cached_dijkstra(city_map, start_city_name)
     
     # Construct paths to all cities
     paths = {}
@@ -159,3 +514,107 @@ def get_all_shortest_paths(city_map, start_city_name):
         paths[end_city_name] = (path, distances[end_city_name])
     
     return paths
+
+def get_distance_matrix(city_map):
+    """
+    Compute all-pairs shortest distances over integer city indices.
+    
+    Runs Dijkstra once per city on the CSR view and stores the result on the
+    city map until the map changes; later shortest-path queries on the same
+    map then read the matrices instead of searching.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        
+    Returns:
+        tuple: (names, name_to_idx, dist, toward) where:
+            - dist[i][j] is the shortest distance between cities i and j
+              (infinity if unreachable)
+            - toward[j][i] is the index of the city following i on the shortest
+              path from i to j (-1 if unreachable or i == j)
+    """
+    if city_map._all_pairs_indexed is None:
+        names, name_to_idx = city_map.build_csr()[:2]
+        n = len(names)
+        dist = []
+        toward = []
+        
+        # Routes are bidirectional, so the predecessor of a city in the tree
+        # rooted at j is the next hop from that city towards j, and the
+        # distance row from j is also the distance column to j
+        for j in range(n):
+            row, pred = _search(city_map, j)
+            dist.append(row)
+            toward.append(pred)
+        
+        city_map._all_pairs_indexed = (names, name_to_idx, dist, toward)
+    
+    return city_map._all_pairs_indexed
+
+def get_distance_rows(city_map, sources):
+    """
+    Compute shortest distances from a few cities to every city.
+    
+    Rows are read from the all-pairs matrix when it already exists; otherwise
+    each source is searched once and its row is stored on the city map until
+    the map changes, so planning a route on a large map does not pay for the
+    full matrix.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        sources (list): Indices of the cities to measure from
+        
+    Returns:
+        dict: Maps each source index to its list of distances indexed by
+              city (infinity if unreachable); the lists are shared and must
+              not be modified
+    """
+    if city_map._all_pairs_indexed is not None:
+        dist = city_map._all_pairs_indexed[2]
+        return {source: dist[source] for source in sources}
+    
+    cache = city_map._distance_rows
+    rows = {}
+    for source in sources:
+        row = cache.get(source)
+        if row is None:
+            row = _search(city_map, source)[0]
+            cache[source] = row
+        rows[source] = row
+    
+    return rows
+
+def compute_all_pairs(city_map):
+    """
+    Compute shortest distances and next hops between every pair of cities.
+    
+    Runs Dijkstra once per city and stores the result on the city map, so
+    planners can look up any segment cost without further searches. The
+    cached matrix is discarded whenever the map changes.
+    
+    Args:
+        city_map (CityMap): The city map containing cities and routes
+        
+    Returns:
+        tuple: (dist, next_hop) where:
+            - dist maps (from_city, to_city) to the shortest distance
+              (infinity if unreachable)
+            - next_hop maps (from_city, to_city) to the city following
+              from_city on the shortest path (None if unreachable or equal)
+    """
+    if city_map._all_pairs is not None:
+        return city_map._all_pairs
+    
+    names, _, dist_idx, toward = get_distance_matrix(city_map)
+    dist = {}
+    next_hop = {}
+    
+    for j, target in enumerate(names):
+        row = dist_idx[j]
+        hops = toward[j]
+        for i, city_name in enumerate(names):
+            dist[(city_name, target)] = row[i]
+            next_hop[(city_name, target)] = names[hops[i]] if hops[i] >= 0 else None
+    
+    city_map._all_pairs = (dist, next_hop)
+    return city_map._all_pairs
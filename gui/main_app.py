@@ -6,11 +6,9 @@ This module implements the main application window and GUI components.
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import json
+import concurrent.futures
 import os
 import sys
-from PIL import Image, ImageTk
-import math
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -18,10 +16,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.city import CityMap
 from models.package import Package
 from models.drone import Drone
-from algorithms.shortest_path import get_shortest_path
-from algorithms.package_selection import knapsack_package_selection
-from algorithms.route_planning import plan_route, get_detailed_route
+from algorithms.delivery_planning import plan_deliveries
 from gui.map_visualization import MapVisualization
+from utils.data_utils import encode_json, decode_json, serialize_data, deserialize_routes
 
 
 class SmartDroneDeliveryApp(tk.Tk):
@@ -61,6 +58,21 @@ class SmartDroneDeliveryApp(tk.Tk):
         self.packages = []
         self.drones = []
         self.delivery_plans = []
+        self._package_ids = set()  # ids in self.packages, for duplicate checks
+        self._drone_ids = set()  # ids in self.drones, for duplicate checks
+        self._batch = False  # True while bulk loading; display updates are skipped
+        self._cities_cache = None  # (city_map, version, cities, city_names)
+        self._combo_city_names = None  # city names last shown in the comboboxes
+        self._trip_rows = ()  # rows last shown in the trips list
+        self._trips_displayed = 0  # number of trips in the visualization dropdown
+        
+        # File reads and writes run on a worker thread to keep the UI responsive
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        
+        # Delivery planning runs on its own worker thread for the same reason
+        self._planning_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._planning_map = None  # (city_map, version, copy planned on)
+        self._planning_future = None  # future of the latest planning run
         
         # Create main container
         self.main_container = ttk.Frame(self)
@@ -80,6 +92,7 @@ class SmartDroneDeliveryApp(tk.Tk):
         self.status_var.set("Ready")
         self.status_bar = ttk.Label(self, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self._status_reset_id = None  # pending after() call restoring the status color
         
         # Bind events
         self.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -146,7 +159,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         cities_frame = ttk.LabelFrame(display_frame, text="Cities")
         cities_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.cities_listbox = tk.Listbox(cities_frame, selectmode=tk.SINGLE)
+        self.cities_list_var = tk.Variable(value=())
+        self.cities_listbox = tk.Listbox(cities_frame, selectmode=tk.SINGLE, listvariable=self.cities_list_var)
         self.cities_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         cities_scrollbar = ttk.Scrollbar(cities_frame, orient=tk.VERTICAL, command=self.cities_listbox.yview)
         cities_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -156,7 +170,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         routes_frame = ttk.LabelFrame(display_frame, text="Routes")
         routes_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.routes_listbox = tk.Listbox(routes_frame, selectmode=tk.SINGLE)
+        self.routes_list_var = tk.Variable(value=())
+        self.routes_listbox = tk.Listbox(routes_frame, selectmode=tk.SINGLE, listvariable=self.routes_list_var)
         self.routes_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         routes_scrollbar = ttk.Scrollbar(routes_frame, orient=tk.VERTICAL, command=self.routes_listbox.yview)
         routes_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -197,7 +212,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         package_list_frame = ttk.Frame(package_frame)
         package_list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.packages_listbox = tk.Listbox(package_list_frame, selectmode=tk.SINGLE)
+        self.packages_list_var = tk.Variable(value=())
+        self.packages_listbox = tk.Listbox(package_list_frame, selectmode=tk.SINGLE, listvariable=self.packages_list_var)
         self.packages_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         packages_scrollbar = ttk.Scrollbar(package_list_frame, orient=tk.VERTICAL, command=self.packages_listbox.yview)
         packages_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -233,7 +249,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         drone_list_frame = ttk.Frame(drone_frame)
         drone_list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.drones_listbox = tk.Listbox(drone_list_frame, selectmode=tk.SINGLE)
+        self.drones_list_var = tk.Variable(value=())
+        self.drones_listbox = tk.Listbox(drone_list_frame, selectmode=tk.SINGLE, listvariable=self.drones_list_var)
         self.drones_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         drones_scrollbar = ttk.Scrollbar(drone_list_frame, orient=tk.VERTICAL, command=self.drones_listbox.yview)
         drones_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -252,8 +269,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         clear_btn = ttk.Button(control_frame, text="Clear All", command=self.clear_data)
         clear_btn.pack(side=tk.LEFT, padx=5)
         
-        run_btn = ttk.Button(control_frame, text="Run Delivery Planning", command=self.run_planning)
-        run_btn.pack(side=tk.RIGHT, padx=5)
+        self.run_btn = ttk.Button(control_frame, text="Run Delivery Planning", command=self.run_planning)
+        self.run_btn.pack(side=tk.RIGHT, padx=5)
         
         # Add sample data button (for testing)
         sample_btn = ttk.Button(control_frame, text="Load Sample Data", command=self.load_sample_data)
@@ -279,7 +296,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         trip_list_frame = ttk.LabelFrame(left_pane, text="Drone Trips")
         trip_list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        self.trips_listbox = tk.Listbox(trip_list_frame, selectmode=tk.SINGLE)
+        self.trips_list_var = tk.Variable(value=())
+        self.trips_listbox = tk.Listbox(trip_list_frame, selectmode=tk.SINGLE, listvariable=self.trips_list_var)
         self.trips_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         trips_scrollbar = ttk.Scrollbar(trip_list_frame, orient=tk.VERTICAL, command=self.trips_listbox.yview)
         trips_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -339,7 +357,7 @@ class SmartDroneDeliveryApp(tk.Tk):
         is_warehouse = self.is_warehouse_var.get()
         
         if not name:
-            messagebox.showerror("Error", "City name cannot be empty")
+            self._show_input_error("City name cannot be empty")
             return
         
         try:
@@ -353,7 +371,7 @@ class SmartDroneDeliveryApp(tk.Tk):
             
             self.status_var.set(f"Added city: {name}")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._show_input_error(str(e))
     
     def add_route(self):
         """Add a route between two cities."""
@@ -362,11 +380,11 @@ class SmartDroneDeliveryApp(tk.Tk):
         distance_str = self.distance_var.get().strip()
         
         if not from_city or not to_city:
-            messagebox.showerror("Error", "Please select both cities")
+            self._show_input_error("Please select both cities")
             return
         
         if from_city == to_city:
-            messagebox.showerror("Error", "Cannot add route to the same city")
+            self._show_input_error("Cannot add route to the same city")
             return
         
         try:
@@ -382,9 +400,9 @@ class SmartDroneDeliveryApp(tk.Tk):
             
             self.status_var.set(f"Added route: {from_city} to {to_city} ({distance})")
         except ValueError as e:
-            messagebox.showerror("Error", f"Invalid distance: {str(e)}")
+            self._show_input_error(f"Invalid distance: {str(e)}")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._show_input_error(str(e))
     
     def add_package(self):
         """Add a package to the list."""
@@ -394,7 +412,7 @@ class SmartDroneDeliveryApp(tk.Tk):
         destination = self.package_dest_var.get()
         
         if not id_str or not weight_str or not value_str or not destination:
-            messagebox.showerror("Error", "All package fields are required")
+            self._show_input_error("All package fields are required")
             return
         
         try:
@@ -402,18 +420,20 @@ class SmartDroneDeliveryApp(tk.Tk):
             weight = float(weight_str)
             value = float(value_str)
             
-            if weight <= 0:
-                raise ValueError("Weight must be positive")
-            if value <= 0:
-                raise ValueError("Value must be positive")
+            if weight <= 0 or value <= 0:
+                raise ValueError("Weight and value must be positive")
             
             # Check for duplicate ID
-            if any(p.id == id for p in self.packages):
+            if id in self._package_ids:
                 raise ValueError(f"Package with ID {id} already exists")
             
             package = Package(id, weight, value, destination)
             self.packages.append(package)
-            self.update_package_display()
+            self._package_ids.add(id)
+            
+            # Append just the new row rather than rebuilding the whole list
+            self.packages_listbox.insert(tk.END, str(package))
+            self.packages_listbox.see(tk.END)
             
             # Clear input fields
             self.package_id_var.set("")
@@ -422,9 +442,9 @@ class SmartDroneDeliveryApp(tk.Tk):
             
             self.status_var.set(f"Added package: {package}")
         except ValueError as e:
-            messagebox.showerror("Error", f"Invalid package data: {str(e)}")
+            self._show_input_error(f"Invalid package data: {str(e)}")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._show_input_error(str(e))
     
     def add_drone(self):
         """Add a drone to the list."""
@@ -433,7 +453,7 @@ class SmartDroneDeliveryApp(tk.Tk):
         distance_str = self.drone_distance_var.get().strip()
         
         if not id_str or not weight_str or not distance_str:
-            messagebox.showerror("Error", "All drone fields are required")
+            self._show_input_error("All drone fields are required")
             return
         
         try:
@@ -441,18 +461,20 @@ class SmartDroneDeliveryApp(tk.Tk):
             max_weight = float(weight_str)
             max_distance = float(distance_str)
             
-            if max_weight <= 0:
-                raise ValueError("Max weight must be positive")
-            if max_distance <= 0:
-                raise ValueError("Max distance must be positive")
+            if max_weight <= 0 or max_distance <= 0:
+                raise ValueError("Max weight and max distance must be positive")
             
             # Check for duplicate ID
-            if any(d.id == id for d in self.drones):
+            if id in self._drone_ids:
                 raise ValueError(f"Drone with ID {id} already exists")
             
             drone = Drone(id, max_weight, max_distance)
             self.drones.append(drone)
-            self.update_drone_display()
+            self._drone_ids.add(id)
+            
+            # Append just the new row rather than rebuilding the whole list
+            self.drones_listbox.insert(tk.END, str(drone))
+            self.drones_listbox.see(tk.END)
             
             # Clear input fields
             self.drone_id_var.set("")
@@ -461,44 +483,96 @@ class SmartDroneDeliveryApp(tk.Tk):
             
             self.status_var.set(f"Added drone: {drone}")
         except ValueError as e:
-            messagebox.showerror("Error", f"Invalid drone data: {str(e)}")
+            self._show_input_error(f"Invalid drone data: {str(e)}")
         except Exception as e:
-            messagebox.showerror("Error", str(e))
+            self._show_input_error(str(e))
+    
+    def _show_input_error(self, message):
+        """
+        Show an input validation error in the status bar.
+        
+        The status bar turns red for a few seconds instead of opening a
+        modal dialog for every rejected entry.
+        
+        Args:
+            message (str): The error message
+        """
+        self.status_var.set(f"⚠ {message}")
+        self.status_bar.configure(foreground=self.warning_color)
+        
+        # Restart the timer that restores the default color
+        if self._status_reset_id is not None:
+            self.after_cancel(self._status_reset_id)
+        self._status_reset_id = self.after(3000, self._reset_status_color)
+    
+    def _reset_status_color(self):
+        """Restore the status bar's default text color."""
+        self._status_reset_id = None
+        self.status_bar.configure(foreground='')
+    
+    def _cities(self):
+        """
+        Get all cities and their names, cached until the city map changes.
+        
+        Returns:
+            tuple: (cities, city_names) where both are tuples in map order
+        """
+        city_map = self.city_map
+        cache = self._cities_cache
+        if cache is None or cache[0] is not city_map or cache[1] != city_map.version:
+            cities = tuple(city_map.get_all_cities())
+            cache = (city_map, city_map.version, cities, tuple(city.name for city in cities))
+            self._cities_cache = cache
+        return cache[2], cache[3]
     
     def update_city_display(self):
         """Update the cities listbox."""
-        self.cities_listbox.delete(0, tk.END)
-        for city in self.city_map.get_all_cities():
-            self.cities_listbox.insert(tk.END, str(city))
+        if self._batch:
+            return
+        
+        # Replacing the list variable refills the listbox in a single Tk call
+        items = tuple(str(city) for city in self._cities()[0])
+        self.cities_list_var.set(items)
     
     def update_route_display(self):
         """Update the routes listbox."""
-        self.routes_listbox.delete(0, tk.END)
-        for city_name, neighbors in self.city_map.routes.items():
-            for neighbor, distance in neighbors.items():
-                # Only add each route once (avoid duplicates due to bidirectional routes)
-                if city_name < neighbor:
-                    self.routes_listbox.insert(tk.END, f"{city_name} ↔ {neighbor}: {distance}")
+        if self._batch:
+            return
+        
+        # Each bidirectional route is listed once in the map's edge table
+        items = tuple(f"{city1} ↔ {city2}: {distance}"
+                      for (city1, city2), distance in self.city_map.edges.items())
+        self.routes_list_var.set(items)
     
     def update_package_display(self):
         """Update the packages listbox."""
-        self.packages_listbox.delete(0, tk.END)
-        for package in self.packages:
-            self.packages_listbox.insert(tk.END, str(package))
+        if self._batch:
+            return
+        
+        items = tuple(str(package) for package in self.packages)
+        self.packages_list_var.set(items)
     
     def update_drone_display(self):
         """Update the drones listbox."""
-        self.drones_listbox.delete(0, tk.END)
-        for drone in self.drones:
-            self.drones_listbox.insert(tk.END, str(drone))
+        if self._batch:
+            return
+        
+        items = tuple(str(drone) for drone in self.drones)
+        self.drones_list_var.set(items)
     
     def update_city_combos(self):
         """Update city comboboxes."""
-        city_names = [city.name for city in self.city_map.get_all_cities()]
+        if self._batch:
+            return
         
-        self.from_city_combo['values'] = city_names
-        self.to_city_combo['values'] = city_names
-        self.package_dest_combo['values'] = city_names
+        city_names = self._cities()[1]
+        
+        # Only send the names to Tk when they have changed
+        if city_names != self._combo_city_names:
+            self.from_city_combo['values'] = city_names
+            self.to_city_combo['values'] = city_names
+            self.package_dest_combo['values'] = city_names
+            self._combo_city_names = city_names
         
         # Clear current selections if they're no longer valid
         if self.from_city_var.get() not in city_names:
@@ -518,47 +592,62 @@ class SmartDroneDeliveryApp(tk.Tk):
         if not filename:
             return
         
+        # Read and parse the file off the Tk thread
+        self.status_var.set(f"Loading {os.path.basename(filename)}...")
+        future = self._io_pool.submit(_read_json_file, filename)
+        self._when_done(future, lambda future: self._apply_loaded_data(filename, future))
+    
+    def _apply_loaded_data(self, filename, future):
+        """
+        Replace the current data with data read by load_data.
+        
+        Args:
+            filename (str): Path of the loaded file
+            future (Future): Finished future holding the decoded JSON data
+        """
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-            
-            # Clear current data
-            self.clear_data(confirm=False)
+            data = future.result()
             
-            # Load cities and routes
-            for city_data in data.get('cities', []):
-                self.city_map.add_city(city_data['name'], city_data.get('is_warehouse', False))
-            
-            for route_data in data.get('routes', []):
-                self.city_map.add_route(
-                    route_data['from_city'],
-                    route_data['to_city'],
-                    route_data['distance']
-                )
-            
-            # Load packages
-            for pkg_data in data.get('packages', []):
-                self.packages.append(Package(
-                    pkg_data['id'],
-                    pkg_data['weight'],
-                    pkg_data['value'],
-                    pkg_data['destination']
-                ))
-            
-            # Load drones
-            for drone_data in data.get('drones', []):
-                self.drones.append(Drone(
-                    drone_data['id'],
-                    drone_data['max_weight'],
-                    drone_data['max_distance']
-                ))
-            
-            # Update displays
-            self.update_city_display()
-            self.update_route_display()
-            self.update_package_display()
-            self.update_drone_display()
-            self.update_city_combos()
+            # Skip display updates until all data is loaded
+            self._batch = True
+            try:
+                # Clear current data
+                self.clear_data(confirm=False)
+                
+                # Load cities and routes
+                for city_data in data.get('cities', []):
+                    self.city_map.add_city(city_data['name'], city_data.get('is_warehouse', False))
+                
+                self.city_map.batch_add_routes(deserialize_routes(data))
+                
+                # Load packages
+                for pkg_data in data.get('packages', []):
+                    self.packages.append(Package(
+                        pkg_data['id'],
+                        pkg_data['weight'],
+                        pkg_data['value'],
+                        pkg_data['destination']
+                    ))
+                
+                # Load drones
+                for drone_data in data.get('drones', []):
+                    self.drones.append(Drone(
+                        drone_data['id'],
+                        drone_data['max_weight'],
+                        drone_data['max_distance']
+                    ))
+                
+                self._package_ids = {package.id for package in self.packages}
+                self._drone_ids = {drone.id for drone in self.drones}
+            finally:
+                self._batch = False
+                
+                # Update displays
+                self.update_city_display()
+                self.update_route_display()
+                self.update_package_display()
+                self.update_drone_display()
+                self.update_city_combos()
             
             self.status_var.set(f"Data loaded from {os.path.basename(filename)}")
             messagebox.showinfo("Success", "Data loaded successfully")
@@ -577,52 +666,45 @@ class SmartDroneDeliveryApp(tk.Tk):
             return
         
         try:
-            # Prepare data
-            data = {
-                'cities': [
-                    {
-                        'name': city.name,
-                        'is_warehouse': city.is_warehouse
-                    }
-                    for city in self.city_map.get_all_cities()
-                ],
-                'routes': [
-                    {
-                        'from_city': city_name,
-                        'to_city': neighbor,
-                        'distance': distance
-                    }
-                    for city_name, neighbors in self.city_map.routes.items()
-                    for neighbor, distance in neighbors.items()
-                    if city_name < neighbor  # Only include each route once
-                ],
-                'packages': [
-                    {
-                        'id': package.id,
-                        'weight': package.weight,
-                        'value': package.value,
-                        'destination': package.destination
-                    }
-                    for package in self.packages
-                ],
-                'drones': [
-                    {
-                        'id': drone.id,
-                        'max_weight': drone.max_weight,
-                        'max_distance': drone.max_distance
-                    }
-                    for drone in self.drones
-                ]
-            }
-            
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
+            data = serialize_data(self.city_map, self.packages, self.drones)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save data: {str(e)}")
+            return
+        
+        # Encode and write the file off the Tk thread
+        self.status_var.set(f"Saving {os.path.basename(filename)}...")
+        future = self._io_pool.submit(_write_json_file, filename, data)
+        self._when_done(future, lambda future: self._finish_save(filename, future))
+    
+    def _finish_save(self, filename, future):
+        """
+        Report the outcome of a save started by save_data.
+        
+        Args:
+            filename (str): Path of the saved file
+            future (Future): Finished future of the write
+        """
+        try:
+            future.result()
             
             self.status_var.set(f"Data saved to {os.path.basename(filename)}")
             messagebox.showinfo("Success", "Data saved successfully")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save data: {str(e)}")
     
+    def _when_done(self, future, callback):
+        """
+        Call callback with the future on the Tk thread once it has finished.
+        
+        Args:
+            future (Future): Future of work submitted to a worker pool
+            callback (callable): Function taking the finished future
+        """
+        if future.done():
+            callback(future)
+        else:
+            self.after(50, self._when_done, future, callback)
+    
     def clear_data(self, confirm=True):
         """Clear all data."""
         if confirm:
@@ -634,6 +716,8 @@ class SmartDroneDeliveryApp(tk.Tk):
         self.packages = []
         self.drones = []
         self.delivery_plans = []
+        self._package_ids = set()
+        self._drone_ids = set()
         
         # Clear displays
         self.update_city_display()
@@ -643,13 +727,9 @@ class SmartDroneDeliveryApp(tk.Tk):
         self.update_city_combos()
         
         # Clear trip displays
-        self.trips_listbox.delete(0, tk.END)
-        self.trip_details_text.config(state=tk.NORMAL)
-        self.trip_details_text.delete(1.0, tk.END)
-        self.trip_details_text.config(state=tk.DISABLED)
+        self.update_trip_display()
         
         # Clear visualization
-        self.viz_trip_combo['values'] = []
         self.viz_trip_var.set('')
         self.map_visualization.clear()
         
@@ -670,88 +750,63 @@ class SmartDroneDeliveryApp(tk.Tk):
             messagebox.showerror("Error", "No drones defined")
             return
         
-        try:
-            # Clear previous results
+        # Get warehouse city name
+        warehouse_city = self.city_map.get_warehouse_city()
+        warehouse_name = warehouse_city.name
+        
+        # Plan on a copy of the map, so edits made while planning runs cannot
+        # race with the planner's path caches; the copy (and the paths cached
+        # on it) is reused until the map changes
+        city_map = self.city_map
+        if self._planning_map is None or self._planning_map[:2] != (city_map, city_map.version):
+            self._planning_map = (city_map, city_map.version, city_map.copy())
+        snapshot = (city_map, city_map.version, list(self.packages), list(self.drones))
+        
+        # Plan trips for every drone off the Tk thread; the previous results
+        # stay on display until the new ones replace them
+        self.run_btn.state(['disabled'])
+        self.status_var.set("Planning deliveries...")
+        future = self._planning_pool.submit(
+            plan_deliveries,
+            self._planning_map[2],
+            snapshot[2],
+            snapshot[3],
+            warehouse_name
+        )
+        self._planning_future = future
+        self._when_done(future, lambda future: self._finish_planning(snapshot, future))
+    
+    def _finish_planning(self, snapshot, future):
+        """
+        Show the delivery plans computed by run_planning.
+        
+        Args:
+            snapshot (tuple): (city_map, version, packages, drones) planning started with
+            future (Future): Finished future holding plan_deliveries' result
+        """
+        self.run_btn.state(['!disabled'])
+        
+        # Results for data that has since been edited or replaced are stale
+        city_map, version, packages, drones = snapshot
+        if (city_map is not self.city_map or version != city_map.version
+                or packages != self.packages or drones != self.drones):
             self.delivery_plans = []
-            self.trips_listbox.delete(0, tk.END)
-            self.trip_details_text.config(state=tk.NORMAL)
-            self.trip_details_text.delete(1.0, tk.END)
-            self.trip_details_text.config(state=tk.DISABLED)
-            
-            # Get warehouse city name
-            warehouse_city = self.city_map.get_warehouse_city()
-            warehouse_name = warehouse_city.name
-            
-            # Create a copy of packages to work with
-            remaining_packages = self.packages.copy()
-            
-            # Process each drone
-            for drone in self.drones:
-                drone_plans = []
-                
-                # Continue planning trips until no more packages can be delivered
-                while remaining_packages:
-                    try:
-                        # Select packages for this trip
-                        selected_packages, total_value, total_weight, route = knapsack_package_selection(
-                            remaining_packages,
-                            drone.max_weight,
-                            self.city_map,
-                            drone.max_distance,
-                            warehouse_name
-                        )
-                        
-                        if not selected_packages:
-                            # No feasible packages for this drone
-                            break
-                        
-                        # Get detailed route
-                        detailed_route, segment_distances, total_distance = get_detailed_route(
-                            self.city_map,
-                            route
-                        )
-                        
-                        # Create trip plan
-                        trip_plan = {
-                            'drone': drone,
-                            'packages': selected_packages,
-                            'total_value': total_value,
-                            'total_weight': total_weight,
-                            'route': route,
-                            'detailed_route': detailed_route,
-                            'segment_distances': segment_distances,
-                            'total_distance': total_distance
-                        }
-                        
-                        drone_plans.append(trip_plan)
-                        self.delivery_plans.append(trip_plan)
-                        
-                        # Remove delivered packages
-                        for package in selected_packages:
-                            remaining_packages.remove(package)
-                        
-                    except Exception as e:
-                        messagebox.showwarning("Warning", f"Planning error: {str(e)}")
-                        break
-            
-            # Update trips display
-            for i, plan in enumerate(self.delivery_plans):
-                drone = plan['drone']
-                packages = plan['packages']
-                self.trips_listbox.insert(
-                    tk.END,
-                    f"Trip {i+1}: Drone {drone.id}, {len(packages)} packages, value: {plan['total_value']}"
-                )
-            
-            # Update visualization dropdown
-            self.viz_trip_combo['values'] = [f"Trip {i+1}" for i in range(len(self.delivery_plans))]
+            self.update_trip_display()
+            self.status_var.set("Data changed while planning; run the planning again.")
+            return
+        
+        try:
+            self.delivery_plans, remaining_packages, errors = future.result()
+            self.update_trip_display()
+            for error in errors:
+                messagebox.showwarning("Warning", f"Planning error: {error}")
             
             # Switch to output tab
             self.notebook.select(1)
             
             if remaining_packages:
                 undelivered = len(remaining_packages)
-                total = len(self.packages)
+                total = len(packages)
                 self.status_var.set(f"Planning complete. {total - undelivered}/{total} packages deliverable.")
                 messagebox.showinfo(
                     "Planning Results",
@@ -760,16 +815,40 @@ class SmartDroneDeliveryApp(tk.Tk):
                     f"Total trips planned: {len(self.delivery_plans)}"
                 )
             else:
-                self.status_var.set(f"Planning complete. All {len(self.packages)} packages deliverable.")
+                self.status_var.set(f"Planning complete. All {len(packages)} packages deliverable.")
                 messagebox.showinfo(
                     "Planning Results",
-                    f"Planning complete. All {len(self.packages)} packages can be delivered in "
+                    f"Planning complete. All {len(packages)} packages can be delivered in "
                     f"{len(self.delivery_plans)} trips."
                 )
                 
         except Exception as e:
+            self.delivery_plans = []
+            self.update_trip_display()
+            self.status_var.set("Planning failed")
             messagebox.showerror("Error", f"Planning failed: {str(e)}")
     
+    def update_trip_display(self):
+        """Update the trips list and the visualization dropdown from the delivery plans."""
+        # Re-planning unchanged data gives the same trips again, so the
+        # widgets are only updated when what they show changes
+        rows = tuple(
+            f"Trip {i+1}: Drone {plan['drone'].id}, {len(plan['packages'])} packages, value: {plan['total_value']}"
+            for i, plan in enumerate(self.delivery_plans)
+        )
+        if rows != self._trip_rows:
+            self._trip_rows = rows
+            self.trips_list_var.set(rows)
+        
+        if len(self.delivery_plans) != self._trips_displayed:
+            self._trips_displayed = len(self.delivery_plans)
+            self.viz_trip_combo['values'] = [f"Trip {i+1}" for i in range(self._trips_displayed)]
+        
+        # Details shown for a previously selected trip may be out of date
+        self.trip_details_text.config(state=tk.NORMAL)
+        self.trip_details_text.delete(1.0, tk.END)
+        self.trip_details_text.config(state=tk.DISABLED)
+    
     def on_trip_select(self, event):
         """Handle trip selection in the listbox."""
         selection = self.trips_listbox.curselection()
@@ -801,42 +880,48 @@ class SmartDroneDeliveryApp(tk.Tk):
         self.trip_details_text.config(state=tk.NORMAL)
         self.trip_details_text.delete(1.0, tk.END)
         
+        # Collect (text, tag) pairs and insert them all in one call
+        segments = []
+        
         # Add header
-        self.trip_details_text.insert(tk.END, f"Drone {drone.id} Trip Details\n\n", 'header')
+        segments += [f"Drone {drone.id} Trip Details\n\n", 'header']
         
         # Add drone info
-        self.trip_details_text.insert(tk.END, "Drone Specifications:\n", 'subheader')
-        self.trip_details_text.insert(tk.END, f"  Max Weight: {drone.max_weight} kg\n", 'normal')
-        self.trip_details_text.insert(tk.END, f"  Max Distance: {drone.max_distance} units\n\n", 'normal')
+        segments += ["Drone Specifications:\n", 'subheader']
+        segments += [f"  Max Weight: {drone.max_weight} kg\n", 'normal']
+        segments += [f"  Max Distance: {drone.max_distance} units\n\n", 'normal']
         
         # Add trip summary
-        self.trip_details_text.insert(tk.END, "Trip Summary:\n", 'subheader')
-        self.trip_details_text.insert(tk.END, f"  Packages: {len(packages)}\n", 'normal')
-        self.trip_details_text.insert(tk.END, f"  Total Weight: {total_weight:.2f} kg", 'normal')
+        segments += ["Trip Summary:\n", 'subheader']
+        segments += [f"  Packages: {len(packages)}\n", 'normal']
+        segments += [f"  Total Weight: {total_weight:.2f} kg", 'normal']
         if total_weight > 0.9 * drone.max_weight:
-            self.trip_details_text.insert(tk.END, f" (Weight Capacity: {total_weight/drone.max_weight:.1%})\n", 'highlight')
+            segments += [f" (Weight Capacity: {total_weight/drone.max_weight:.1%})\n", 'highlight']
         else:
-            self.trip_details_text.insert(tk.END, "\n", 'normal')
+            segments += ["\n", 'normal']
         
-        self.trip_details_text.insert(tk.END, f"  Total Value: {total_value:.2f}\n", 'normal')
-        self.trip_details_text.insert(tk.END, f"  Total Distance: {total_distance:.2f}", 'normal')
+        segments += [f"  Total Value: {total_value:.2f}\n", 'normal']
+        segments += [f"  Total Distance: {total_distance:.2f}", 'normal']
         if total_distance > 0.9 * drone.max_distance:
-            self.trip_details_text.insert(tk.END, f" (Distance Capacity: {total_distance/drone.max_distance:.1%})\n\n", 'highlight')
+            segments += [f" (Distance Capacity: {total_distance/drone.max_distance:.1%})\n\n", 'highlight']
         else:
-            self.trip_details_text.insert(tk.END, "\n\n", 'normal')
+            segments += ["\n\n", 'normal']
         
         # Add package details
-        self.trip_details_text.insert(tk.END, "Packages:\n", 'subheader')
-        for i, package in enumerate(packages):
-            self.trip_details_text.insert(tk.END, f"  {i+1}. Package {package.id}: {package.weight} kg, value {package.value}, to {package.destination}\n", 'normal')
-        self.trip_details_text.insert(tk.END, "\n", 'normal')
+        segments += ["Packages:\n", 'subheader']
+        segments += ["".join(
+            f"  {i+1}. Package {package.id}: {package.weight} kg, value {package.value}, to {package.destination}\n"
+            for i, package in enumerate(packages)
+        ) + "\n", 'normal']
         
         # Add route details
-        self.trip_details_text.insert(tk.END, "Route:\n", 'subheader')
-        self.trip_details_text.insert(tk.END, f"  High-level: {' → '.join(route)}\n\n", 'normal')
+        segments += ["Route:\n", 'subheader']
+        segments += [f"  High-level: {' → '.join(route)}\n\n", 'normal']
+        
+        segments += ["Detailed Route:\n", 'subheader']
+        segments += [f"  {' → '.join(detailed_route)}\n", 'normal']
         
-        self.trip_details_text.insert(tk.END, "Detailed Route:\n", 'subheader')
-        self.trip_details_text.insert(tk.END, f"  {' → '.join(detailed_route)}\n", 'normal')
+        self.trip_details_text.insert(tk.END, *segments)
         
         # Disable editing
         self.trip_details_text.config(state=tk.DISABLED)
@@ -892,40 +977,48 @@ class SmartDroneDeliveryApp(tk.Tk):
     
     def load_sample_data(self):
         """Load sample data for testing."""
-        # Clear current data
-        self.clear_data(confirm=False)
-        
-        # Add cities
-        self.city_map.add_city("Warehouse", True)
-        self.city_map.add_city("City A")
-        self.city_map.add_city("City B")
-        self.city_map.add_city("City C")
-        self.city_map.add_city("City D")
-        self.city_map.add_city("City E")
-        
-        # Add routes
-        self.city_map.add_route("Warehouse", "City A", 10)
-        self.city_map.add_route("Warehouse", "City B", 15)
-        self.city_map.add_route("Warehouse", "City C", 20)
-        self.city_map.add_route("City A", "City B", 12)
-        self.city_map.add_route("City B", "City C", 8)
-        self.city_map.add_route("City C", "City D", 10)
-        self.city_map.add_route("City D", "City E", 5)
-        self.city_map.add_route("City E", "Warehouse", 25)
-        
-        # Add packages
-        self.packages.append(Package(1, 2.5, 100, "City A"))
-        self.packages.append(Package(2, 1.5, 80, "City A"))
-        self.packages.append(Package(3, 3.0, 120, "City B"))
-        self.packages.append(Package(4, 2.0, 90, "City C"))
-        self.packages.append(Package(5, 4.0, 200, "City D"))
-        self.packages.append(Package(6, 1.0, 50, "City E"))
-        self.packages.append(Package(7, 3.5, 150, "City B"))
-        self.packages.append(Package(8, 2.8, 110, "City C"))
-        
-        # Add drones
-        self.drones.append(Drone(1, 5.0, 50))
-        self.drones.append(Drone(2, 8.0, 80))
+        # Skip display updates until all sample data is added
+        self._batch = True
+        try:
+            # Clear current data
+            self.clear_data(confirm=False)
+            
+            # Add cities
+            self.city_map.add_city("Warehouse", True)
+            self.city_map.add_city("City A")
+            self.city_map.add_city("City B")
+            self.city_map.add_city("City C")
+            self.city_map.add_city("City D")
+            self.city_map.add_city("City E")
+            
+            # Add routes
+            self.city_map.add_route("Warehouse", "City A", 10)
+            self.city_map.add_route("Warehouse", "City B", 15)
+            self.city_map.add_route("Warehouse", "City C", 20)
+            self.city_map.add_route("City A", "City B", 12)
+            self.city_map.add_route("City B", "City C", 8)
+            self.city_map.add_route("City C", "City D", 10)
+            self.city_map.add_route("City D", "City E", 5)
+            self.city_map.add_route("City E", "Warehouse", 25)
+            
+            # Add packages
+            self.packages.append(Package(1, 2.5, 100, "City A"))
+            self.packages.append(Package(2, 1.5, 80, "City A"))
+            self.packages.append(Package(3, 3.0, 120, "City B"))
+            self.packages.append(Package(4, 2.0, 90, "City C"))
+            self.packages.append(Package(5, 4.0, 200, "City D"))
+            self.packages.append(Package(6, 1.0, 50, "City E"))
+            self.packages.append(Package(7, 3.5, 150, "City B"))
+            self.packages.append(Package(8, 2.8, 110, "City C"))
+            
+            # Add drones
+            self.drones.append(Drone(1, 5.0, 50))
+            self.drones.append(Drone(2, 8.0, 80))
+            
+            self._package_ids = {package.id for package in self.packages}
+            self._drone_ids = {drone.id for drone in self.drones}
+        finally:
+            self._batch = False
         
         # Update displays
         self.update_city_display()
@@ -943,9 +1036,43 @@ class SmartDroneDeliveryApp(tk.Tk):
     def on_close(self):
         """Handle window close event."""
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            # Let a save in progress finish writing its file; planning results
+            # are no longer needed
+            self._io_pool.shutdown(wait=True)
+            if self._planning_future is not None:
+                self._planning_future.cancel()
+            self._planning_pool.shutdown(wait=False)
             self.destroy()
 
 
+def _read_json_file(filename):
+    """
+    Read and decode a JSON file.
+    
+    Args:
+        filename (str): Path to the file
+        
+    Returns:
+        The decoded data
+    """
+    with open(filename, 'rb') as f:
+        return decode_json(f.read())
+
+
+def _write_json_file(filename, data):
+    """
+    Encode data as JSON and write it to a file.
+    
+    Args:
+        filename (str): Path to the file
+        data: JSON-serializable data
+    """
+    # Encode before opening the file, so a failure leaves it untouched
+    payload = encode_json(data)
+    with open(filename, 'wb') as f:
+        f.write(payload)
+
+
 def main():
     """Main function to run the application."""
     app = SmartDroneDeliveryApp()
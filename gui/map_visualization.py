@@ -7,7 +7,15 @@ This module provides visualization of the city map and delivery routes.
 import tkinter as tk
 from tkinter import ttk
 import math
-import random
+
+# Smallest number of cities for which the layout approximates the repulsion
+# between distant cities with a quadtree instead of summing every pair
+BARNES_HUT_MIN_CITIES = 200
+
+# Largest ratio of a quadtree cell's size to its distance for which the
+# cell's cities are treated as a single mass at their centroid; below
+# 1/sqrt(2), a cell is never merged into a mass acting on a city inside it
+BARNES_HUT_THETA = 0.7
 
 
 class MapVisualization(ttk.Frame):
@@ -43,6 +51,12 @@ class MapVisualization(ttk.Frame):
         self.route = []
         self.detailed_route = []
         self.packages = []
+        self._layout_cache = {}  # (cities, routes, warehouse, canvas size) -> city_positions
+        self._resize_job = None  # pending after() call redrawing after a resize
+        self._drawn_size = None  # canvas size of the last drawing
+        self._drawn_map = None  # (city_map, version, warehouse) the map items show
+        self._city_items = {}  # city_name -> (circle item, name item)
+        self._route_items = {}  # (city_name, neighbor_name) -> (line item, label item)
         self.drag_start_x = 0
         self.drag_start_y = 0
         
@@ -57,25 +71,45 @@ class MapVisualization(ttk.Frame):
         self.detailed_route_width = 2
         self.city_font = ("Arial", 10, "bold")
         self.canvas_padding = 50
-        
+    
     def clear(self):
         """Clear the visualization."""
         self.canvas.delete("all")
+        self._drawn_map = None
+        self._city_items = {}
+        self._route_items = {}
         self.city_positions = {}
         self.route = []
         self.detailed_route = []
         self.packages = []
-        
+    
     def on_canvas_configure(self, event):
         """Handle canvas resize event."""
-        if self.city_map:
-            self.visualize_city_map(self.city_map, self.route, self.detailed_route, self.packages)
-            
+        if not self.city_map:
+            return
+        
+        # Resizing fires a burst of events; redraw once it has settled
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(150, self._redraw_after_resize)
+    
+    def _redraw_after_resize(self):
+        """Redraw the map for the new canvas size unless it barely changed."""
+        self._resize_job = None
+        
+        if self._drawn_size is not None:
+            drawn_width, drawn_height = self._drawn_size
+            if (abs(self.canvas.winfo_width() - drawn_width) < 3
+                    and abs(self.canvas.winfo_height() - drawn_height) < 3):
+                return
+        
+        self.visualize_city_map(self.city_map, self.route, self.detailed_route, self.packages)
+    
     def on_canvas_press(self, event):
         """Handle canvas mouse press event."""
         self.drag_start_x = event.x
         self.drag_start_y = event.y
-        
+    
     def on_canvas_drag(self, event):
         """Handle canvas drag event for panning."""
         dx = event.x - self.drag_start_x
@@ -86,7 +120,7 @@ class MapVisualization(ttk.Frame):
         
         self.drag_start_x = event.x
         self.drag_start_y = event.y
-        
+    
     def visualize_city_map(self, city_map, route=None, detailed_route=None, packages=None):
         """
         Visualize the city map and optionally a delivery route.
@@ -97,7 +131,13 @@ class MapVisualization(ttk.Frame):
             detailed_route (list, optional): List of city names representing the detailed route
             packages (list, optional): List of Package objects being delivered
         """
-        self.clear()
+        # The map items are kept while the cities and routes stay the same;
+        # only the trip drawn on top of them is replaced
+        drawn_map = (city_map, city_map.version, city_map.get_warehouse_city())
+        if drawn_map != self._drawn_map:
+            self.clear()
+        else:
+            self.canvas.delete("trip")
         
         self.city_map = city_map
         self.route = route or []
@@ -109,14 +149,28 @@ class MapVisualization(ttk.Frame):
         if not cities:
             return
         
-        # Calculate city positions using force-directed layout
-        self.calculate_city_positions(cities)
-        
-        # Draw routes
-        self.draw_routes()
+        size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if self._drawn_map is None:
+            # Calculate city positions using force-directed layout
+            self.calculate_city_positions(cities)
+            
+            # Draw routes
+            self.draw_routes()
+            
+            # Draw cities
+            self.draw_cities(cities)
+            
+            self._drawn_map = drawn_map
+        elif size != self._drawn_size:
+            # Lay the same map out for the new canvas size and move the
+            # existing items there
+            self.city_positions = {}
+            self.calculate_city_positions(cities)
+            self.move_map_items()
         
-        # Draw cities
-        self.draw_cities(cities)
+        # Draw package counts if packages are provided
+        if self.packages:
+            self.draw_package_counts(cities)
         
         # Draw route if provided
         if self.route:
@@ -124,7 +178,8 @@ class MapVisualization(ttk.Frame):
         
         # Configure canvas scrolling
         self.canvas.config(scrollregion=self.canvas.bbox("all"))
-        
+        self._drawn_size = size
+    
     def calculate_city_positions(self, cities):
         """
         Calculate positions for cities using a simple force-directed layout.
@@ -136,87 +191,158 @@ class MapVisualization(ttk.Frame):
         if self.city_positions and len(self.city_positions) == len(cities):
             return
         
-        # Get canvas dimensions
-        canvas_width = self.canvas.winfo_width() or 800
-        canvas_height = self.canvas.winfo_height() or 600
+        # Get canvas dimensions; the layout area is never smaller than the
+        # padding plus a small circle of cities, so on tiny canvases (Tk
+        # reports 1x1 before the widget is mapped) the cities do not all
+        # start on, or get clamped to, the same spot
+        min_size = 2 * self.canvas_padding + 4 * self.city_radius
+        canvas_width = max(self.canvas.winfo_width() or 800, min_size)
+        canvas_height = max(self.canvas.winfo_height() or 600, min_size)
+        
+        # Reuse the layout of the same cities, routes and warehouse on a canvas
+        # of the same size, so redrawing or selecting another trip does not
+        # re-run the layout (or move the cities around)
+        warehouse = self.city_map.get_warehouse_city()
+        layout_key = (
+            tuple(sorted(city.name for city in cities)),
+            tuple(sorted(self.city_map.edges)),
+            warehouse.name if warehouse else None,
+            canvas_width,
+            canvas_height
+        )
+        cached = self._layout_cache.get(layout_key)
+        if cached is not None:
+            self.city_positions = dict(cached)
+            return
         
-        # Initialize with random positions if needed
+        # Initialize positions if needed: the warehouse at the center and the
+        # other cities evenly spaced on a circle around it, so the same map
+        # always gets the same layout
         if not self.city_positions:
+            center_x = canvas_width / 2
+            center_y = canvas_height / 2
+            # Cities starting on the same spot never repel each other
+            radius = max(self.city_radius * 2, min(center_x, center_y) - self.canvas_padding)
+            
+            ring = [city for city in cities if not city.is_warehouse]
+            for i, city in enumerate(ring):
+                angle = 2 * math.pi * i / len(ring)
+                self.city_positions[city.name] = (
+                    center_x + radius * math.cos(angle),
+                    center_y + radius * math.sin(angle)
+                )
+            
             for city in cities:
-                x = random.randint(self.canvas_padding, canvas_width - self.canvas_padding)
-                y = random.randint(self.canvas_padding, canvas_height - self.canvas_padding)
-                self.city_positions[city.name] = (x, y)
+                if city.is_warehouse:
+                    self.city_positions[city.name] = (center_x, center_y)
         
-        # Apply force-directed layout algorithm
+        # Apply force-directed layout algorithm on index-based coordinate
+        # lists rather than name-keyed dictionaries
         iterations = 50
+        max_step = 30.0  # Largest movement of a city in one iteration
+        cooling = 0.9  # The largest movement shrinks by this factor every iteration
+        min_movement = 1.0  # Stop early once no city moves this many pixels
         k = math.sqrt((canvas_width * canvas_height) / len(cities))  # Optimal distance
+        k2 = k * k
+        hypot = math.hypot
+        padding = self.canvas_padding
+        max_x = canvas_width - padding
+        max_y = canvas_height - padding
+        
+        names = [city.name for city in cities]
+        n = len(names)
+        xs = [self.city_positions[name][0] for name in names]
+        ys = [self.city_positions[name][1] for name in names]
+        
+        # Routes as index pairs, each listed once
+        index = {name: i for i, name in enumerate(names)}
+        edges = [(index[city_name], index[neighbor_name])
+                 for city_name, neighbor_name in self.city_map.edges]
         
         for _ in range(iterations):
-            # Calculate repulsive forces between all cities
-            forces = {city.name: [0, 0] for city in cities}
-            
-            for i, city1 in enumerate(cities):
-                for j, city2 in enumerate(cities):
-                    if i == j:
-                        continue
-                    
-                    # Get positions
-                    x1, y1 = self.city_positions[city1.name]
-                    x2, y2 = self.city_positions[city2.name]
-                    
-                    # Calculate distance
-                    dx = x2 - x1
-                    dy = y2 - y1
-                    distance = max(0.1, math.sqrt(dx*dx + dy*dy))
-                    
-                    # Repulsive force (inversely proportional to distance)
-                    force = k*k / distance
-                    
-                    # Normalize direction
-                    dx /= distance
-                    dy /= distance
-                    
-                    # Apply force
-                    forces[city1.name][0] -= dx * force
-                    forces[city1.name][1] -= dy * force
+            if n >= BARNES_HUT_MIN_CITIES:
+                # Approximate the repulsion of distant groups of cities
+                fxs, fys = _barnes_hut_repulsion(xs, ys, k2)
+            else:
+                fxs = [0.0] * n
+                fys = [0.0] * n
+                
+                # Calculate repulsive forces between all cities; the force between
+                # a pair is computed once and applied to both cities
+                for i in range(n - 1):
+                    x1 = xs[i]
+                    y1 = ys[i]
+                    fx1 = 0.0
+                    fy1 = 0.0
+                    for j in range(i + 1, n):
+                        dx = xs[j] - x1
+                        dy = ys[j] - y1
+                        
+                        # Repulsive force (inversely proportional to distance),
+                        # scaled by the normalized direction; this only needs the
+                        # squared distance, so no square root is taken
+                        distance_sq = dx*dx + dy*dy
+                        if distance_sq < 0.01:
+                            distance_sq = 0.01
+                        scale = k2 / distance_sq
+                        dx *= scale
+                        dy *= scale
+                        fx1 -= dx
+                        fy1 -= dy
+                        fxs[j] += dx
+                        fys[j] += dy
+                    fxs[i] += fx1
+                    fys[i] += fy1
             
             # Calculate attractive forces along routes
-            for city_name, neighbors in self.city_map.routes.items():
-                for neighbor_name in neighbors:
-                    # Get positions
-                    x1, y1 = self.city_positions[city_name]
-                    x2, y2 = self.city_positions[neighbor_name]
-                    
-                    # Calculate distance
-                    dx = x2 - x1
-                    dy = y2 - y1
-                    distance = max(0.1, math.sqrt(dx*dx + dy*dy))
-                    
-                    # Attractive force (proportional to distance)
-                    force = distance*distance / k
-                    
-                    # Normalize direction
-                    dx /= distance
-                    dy /= distance
-                    
-                    # Apply force
-                    forces[city_name][0] += dx * force
-                    forces[city_name][1] += dy * force
+            for a, b in edges:
+                dx = xs[b] - xs[a]
+                dy = ys[b] - ys[a]
+                distance = hypot(dx, dy)
+                if distance < 0.1:
+                    distance = 0.1
+                
+                # Attractive force (proportional to distance), scaled by the
+                # normalized direction; it pulls both cities towards each other
+                scale = distance / k
+                dx *= scale
+                dy *= scale
+                fxs[a] += dx
+                fys[a] += dy
+                fxs[b] -= dx
+                fys[b] -= dy
             
-            # Update positions
-            for city in cities:
-                fx, fy = forces[city.name]
+            # Update positions, tracking the largest movement of any city
+            max_movement = 0.0
+            for i in range(n):
+                fx = fxs[i]
+                fy = fys[i]
                 
                 # Limit maximum movement
-                mag = math.sqrt(fx*fx + fy*fy)
-                if mag > 30:
-                    fx = fx * 30 / mag
-                    fy = fy * 30 / mag
+                mag = hypot(fx, fy)
+                if mag > max_step:
+                    fx = fx * max_step / mag
+                    fy = fy * max_step / mag
                 
-                x, y = self.city_positions[city.name]
-                new_x = max(self.canvas_padding, min(canvas_width - self.canvas_padding, x + fx))
-                new_y = max(self.canvas_padding, min(canvas_height - self.canvas_padding, y + fy))
-                self.city_positions[city.name] = (new_x, new_y)
+                x = max(padding, min(max_x, xs[i] + fx))
+                y = max(padding, min(max_y, ys[i] + fy))
+                movement = hypot(x - xs[i], y - ys[i])
+                if movement > max_movement:
+                    max_movement = movement
+                xs[i] = x
+                ys[i] = y
+            
+            # The layout has settled; further iterations would not visibly
+            # change it
+            if max_movement < min_movement:
+                break
+            
+            # Cool down, so later iterations only fine-tune the layout instead
+            # of letting cities swing back and forth
+            max_step *= cooling
+        
+        for name, x, y in zip(names, xs, ys):
+            self.city_positions[name] = (x, y)
         
         # Ensure warehouse is centered if possible
         warehouse = self.city_map.get_warehouse_city()
@@ -233,6 +359,12 @@ class MapVisualization(ttk.Frame):
             for city_name in self.city_positions:
                 x, y = self.city_positions[city_name]
                 self.city_positions[city_name] = (x + offset_x, y + offset_y)
+        
+        # Remember the layout; old entries are dropped once the map has
+        # been edited many times
+        if len(self._layout_cache) >= 16:
+            self._layout_cache.clear()
+        self._layout_cache[layout_key] = dict(self.city_positions)
     
     def draw_cities(self, cities):
         """
@@ -246,7 +378,7 @@ class MapVisualization(ttk.Frame):
             
             # Draw city circle
             if city.is_warehouse:
-                self.canvas.create_oval(
+                circle = self.canvas.create_oval(
                     x - self.warehouse_radius,
                     y - self.warehouse_radius,
                     x + self.warehouse_radius,
@@ -257,7 +389,7 @@ class MapVisualization(ttk.Frame):
                     tags=("city", "warehouse")
                 )
             else:
-                self.canvas.create_oval(
+                circle = self.canvas.create_oval(
                     x - self.city_radius,
                     y - self.city_radius,
                     x + self.city_radius,
@@ -269,7 +401,7 @@ class MapVisualization(ttk.Frame):
                 )
             
             # Draw city name
-            self.canvas.create_text(
+            label = self.canvas.create_text(
                 x,
                 y,
                 text=city.name,
@@ -278,54 +410,83 @@ class MapVisualization(ttk.Frame):
                 tags=("city_label",)
             )
             
-            # Draw package count if this city is a destination
-            if self.packages:
-                package_count = sum(1 for p in self.packages if p.destination == city.name)
-                if package_count > 0:
-                    self.canvas.create_text(
-                        x,
-                        y + self.city_radius + 15,
-                        text=f"{package_count} pkg",
-                        font=("Arial", 8),
-                        fill="black",
-                        tags=("package_count",)
-                    )
+            self._city_items[city.name] = (circle, label)
+    
+    def draw_package_counts(self, cities):
+        """
+        Draw the number of packages delivered to each destination city.
+        
+        Args:
+            cities (list): List of City objects
+        """
+        for city in cities:
+            package_count = sum(1 for p in self.packages if p.destination == city.name)
+            if package_count > 0:
+                x, y = self.city_positions[city.name]
+                self.canvas.create_text(
+                    x,
+                    y + self.city_radius + 15,
+                    text=f"{package_count} pkg",
+                    font=("Arial", 8),
+                    fill="black",
+                    tags=("package_count", "trip")
+                )
+    
+    def move_map_items(self):
+        """Move the drawn cities and routes to the current city positions."""
+        coords = self.canvas.coords
+        positions = self.city_positions
+        cities = self.city_map.cities
+        
+        for city_name, (circle, label) in self._city_items.items():
+            x, y = positions[city_name]
+            if cities[city_name].is_warehouse:
+                radius = self.warehouse_radius
+            else:
+                radius = self.city_radius
+            coords(circle, x - radius, y - radius, x + radius, y + radius)
+            coords(label, x, y)
+        
+        for (city_name, neighbor_name), (line, label) in self._route_items.items():
+            x1, y1 = positions[city_name]
+            x2, y2 = positions[neighbor_name]
+            coords(line, x1, y1, x2, y2)
+            coords(label, (x1 + x2) / 2, (y1 + y2) / 2)
     
     def draw_routes(self):
         """Draw all routes between cities."""
-        for city_name, neighbors in self.city_map.routes.items():
-            if city_name not in self.city_positions:
+        positions = self.city_positions
+        
+        # Each route is listed once in the map's edge list, so bidirectional
+        # routes need no duplicate filtering
+        for (city_name, neighbor_name), distance in self.city_map.edges.items():
+            if city_name not in positions or neighbor_name not in positions:
                 continue
-                
-            x1, y1 = self.city_positions[city_name]
             
-            for neighbor_name, distance in neighbors.items():
-                if neighbor_name not in self.city_positions:
-                    continue
-                    
-                # Only draw each route once (avoid duplicates due to bidirectional routes)
-                if city_name < neighbor_name:
-                    x2, y2 = self.city_positions[neighbor_name]
-                    
-                    # Draw route line
-                    self.canvas.create_line(
-                        x1, y1, x2, y2,
-                        fill="gray",
-                        width=1,
-                        tags=("route",)
-                    )
-                    
-                    # Draw distance label
-                    mid_x = (x1 + x2) / 2
-                    mid_y = (y1 + y2) / 2
-                    
-                    self.canvas.create_text(
-                        mid_x, mid_y,
-                        text=str(distance),
-                        font=("Arial", 8),
-                        fill="black",
-                        tags=("distance_label",)
-                    )
+            x1, y1 = positions[city_name]
+            x2, y2 = positions[neighbor_name]
+            
+            # Draw route line
+            line = self.canvas.create_line(
+                x1, y1, x2, y2,
+                fill="gray",
+                width=1,
+                tags=("route",)
+            )
+            
+            # Draw distance label
+            mid_x = (x1 + x2) / 2
+            mid_y = (y1 + y2) / 2
+            
+            label = self.canvas.create_text(
+                mid_x, mid_y,
+                text=str(distance),
+                font=("Arial", 8),
+                fill="black",
+                tags=("distance_label",)
+            )
+            
+            self._route_items[(city_name, neighbor_name)] = (line, label)
     
     def draw_delivery_route(self):
         """Draw the delivery route if provided."""
@@ -345,7 +506,7 @@ class MapVisualization(ttk.Frame):
                         fill=self.route_color,
                         width=self.route_width,
                         arrow=tk.LAST,
-                        tags=("delivery_route",)
+                        tags=("delivery_route", "trip")
                     )
         
         # Draw detailed route if different from high-level route
@@ -364,5 +525,119 @@ class MapVisualization(ttk.Frame):
                         fill=self.detailed_route_color,
                         width=self.detailed_route_width,
                         dash=(5, 2),
-                        tags=("detailed_route",)
+                        tags=("detailed_route", "trip")
                     )
+
+
+def _build_quadtree(xs, ys, points, x0, y0, size, tree):
+    """
+    Build a quadtree node over the given cities and append it to the tree.
+    
+    Args:
+        xs (list): X coordinates of all cities
+        ys (list): Y coordinates of all cities
+        points (list): Indices of the cities inside this node's square
+        x0 (float): Left edge of the node's square
+        y0 (float): Top edge of the node's square
+        size (float): Side length of the node's square
+        tree (list): Nodes built so far, as (mass, cx, cy, size, children, points)
+    
+    Returns:
+        int: Index of the new node in the tree
+    """
+    node = len(tree)
+    mass = len(points)
+    cx = sum(xs[i] for i in points) / mass
+    cy = sum(ys[i] for i in points) / mass
+    tree.append(None)
+    
+    # Small groups of cities are summed directly rather than split further
+    if mass <= 4 or size < 1.0:
+        tree[node] = (mass, cx, cy, size, None, points)
+        return node
+    
+    half = size / 2
+    mid_x = x0 + half
+    mid_y = y0 + half
+    quadrants = ([], [], [], [])
+    for i in points:
+        quadrants[(xs[i] >= mid_x) + 2 * (ys[i] >= mid_y)].append(i)
+    
+    children = []
+    for q, quadrant in enumerate(quadrants):
+        if quadrant:
+            children.append(_build_quadtree(
+                xs, ys, quadrant,
+                mid_x if q & 1 else x0,
+                mid_y if q & 2 else y0,
+                half, tree
+            ))
+    
+    tree[node] = (mass, cx, cy, size, children, points)
+    return node
+
+
+def _barnes_hut_repulsion(xs, ys, k2):
+    """
+    Approximate the repulsive forces between cities with a Barnes-Hut quadtree.
+    
+    Cells that are small compared to their distance from a city act on it as
+    a single mass at their centroid, so each city interacts with O(log N)
+    cells rather than every other city.
+    
+    Args:
+        xs (list): X coordinates of all cities
+        ys (list): Y coordinates of all cities
+        k2 (float): Square of the optimal distance between cities
+    
+    Returns:
+        tuple: (fxs, fys) lists of the repulsive force on each city
+    """
+    n = len(xs)
+    x0 = min(xs)
+    y0 = min(ys)
+    size = max(max(xs) - x0, max(ys) - y0) + 1e-9
+    tree = []
+    _build_quadtree(xs, ys, list(range(n)), x0, y0, size, tree)
+    theta2 = BARNES_HUT_THETA * BARNES_HUT_THETA
+    
+    fxs = [0.0] * n
+    fys = [0.0] * n
+    for i in range(n):
+        xi = xs[i]
+        yi = ys[i]
+        fx = 0.0
+        fy = 0.0
+        stack = [0]
+        while stack:
+            mass, cx, cy, cell_size, children, points = tree[stack.pop()]
+            
+            if children is None:
+                # Leaf: sum the forces of its cities directly
+                for j in points:
+                    if j != i:
+                        dx = xs[j] - xi
+                        dy = ys[j] - yi
+                        distance_sq = dx*dx + dy*dy
+                        if distance_sq < 0.01:
+                            distance_sq = 0.01
+                        scale = k2 / distance_sq
+                        fx -= dx * scale
+                        fy -= dy * scale
+                continue
+            
+            dx = cx - xi
+            dy = cy - yi
+            distance_sq = dx*dx + dy*dy
+            if cell_size * cell_size < theta2 * distance_sq:
+                # Far enough away to act as one mass at its centroid
+                scale = k2 * mass / distance_sq
+                fx -= dx * scale
+                fy -= dy * scale
+            else:
+                stack.extend(children)
+        
+        fxs[i] = fx
+        fys[i] = fy
+    
+    return fxs, fys
@@ -5,6 +5,9 @@ This module defines the City and CityMap classes for representing
 the city network as a weighted graph.
 """
 
+import sys
+from types import MappingProxyType
+
 class City:
     """
     Represents a city node in the delivery network.
@@ -14,6 +17,9 @@ class City:
         is_warehouse (bool): Whether this city contains the central warehouse
     """
     
+    # Fixed attributes: smaller instances and faster attribute access
+    __slots__ = ('name', 'is_warehouse')
+    
     def __init__(self, name, is_warehouse=False):
         """
         Initialize a new City object.
@@ -50,14 +56,104 @@ class CityMap:
         cities (dict): Dictionary mapping city names to City objects
         routes (dict): Adjacency list representation of routes between cities
                       {city_name: {neighbor_name: distance}}
+        edges (dict): Each route listed once, keyed by the sorted pair of
+                      city names from edge_key() {(city1_name, city2_name): distance}
         warehouse (City): Reference to the warehouse city
+        version (int): Counter bumped whenever the graph changes; used to
+                       invalidate cached shortest-path results
     """
     
     def __init__(self):
         """Initialize an empty city map."""
         self.cities = {}  # name -> City object
         self.routes = {}  # name -> {neighbor_name: distance}
+        self.edges = {}  # (name, name) in sorted order -> distance
         self.warehouse = None
+        self.version = 0
+        self._names = []  # city names by dense index, in insertion order
+        self._name_to_idx = {}  # city name -> dense index
+        self._dijkstra_cache = {}  # start_city_name -> (distances, predecessors)
+        self._all_pairs = None  # (dist, next_hop) from compute_all_pairs
+        self._all_pairs_indexed = None  # index-based matrices from get_distance_matrix
+        self._distance_rows = {}  # start city index -> distances from get_distance_rows
+        self._csr = None  # compressed adjacency built by build_csr
+        self._dial_steps = None  # integer weights for Dial's algorithm, or False
+        self._route_cache = {}  # (warehouse, frozenset(destinations)) -> (route, distance)
+        self._segment_cache = {}  # sorted (city_name, city_name[, closed routes]) -> (path, distance)
+    
+    def invalidate_path_cache(self):
+        """
+        Invalidate all cached shortest-path results.
+        
+        Called automatically whenever cities or routes are added or removed.
+        """
+        self.version += 1
+        self._dijkstra_cache.clear()
+        self._all_pairs = None
+        self._all_pairs_indexed = None
+        self._distance_rows.clear()
+        self._csr = None
+        self._dial_steps = None
+        self._route_cache.clear()
+        self._segment_cache.clear()
+    
+    @staticmethod
+    def edge_key(city1_name, city2_name):
+        """
+        Return the key a route between two cities is stored under in edges.
+        
+        The key is the pair of names in sorted order, so both directions of a
+        route map to the same key. Names of different types, which do not
+        compare, are ordered by their type name.
+        
+        Args:
+            city1_name (str): The name of the first city
+            city2_name (str): The name of the second city
+            
+        Returns:
+            tuple: (city1_name, city2_name) in sorted order
+        """
+        try:
+            swap = city2_name < city1_name
+        except TypeError:
+            swap = type(city2_name).__name__ < type(city1_name).__name__
+        return (city2_name, city1_name) if swap else (city1_name, city2_name)
+    
+    def build_csr(self):
+        """
+        Build (or reuse) a compressed sparse row view of the routes.
+        
+        Cities are numbered in insertion order. The neighbors of city i are
+        indices[indptr[i]:indptr[i+1]] with matching distances in weights,
+        so path searches scan flat lists instead of nested dictionaries.
+        The view is cached until the map changes; the returned lists and
+        dictionary are shared and must not be modified.
+        
+        Returns:
+            tuple: (names, name_to_idx, indptr, indices, weights) where:
+                - names lists the city names by index
+                - name_to_idx maps each city name to its index
+                - indptr has one entry per city plus one
+                - indices and weights have one entry per route direction
+        """
+        if self._csr is None:
+            # Cities keep the dense index assigned when they were added, so
+            # route changes only rebuild the adjacency lists
+            names = self._names
+            name_to_idx = self._name_to_idx
+            indptr = [0]
+            indices = []
+            weights = []
+            
+            for name in names:
+                neighbors = self.routes[name]
+                indices.extend(map(name_to_idx.__getitem__, neighbors))
+                weights.extend(neighbors.values())
+                indptr.append(len(indices))
+            
+            self._csr = (names, name_to_idx, indptr, indices, weights)
+        
+        return self._csr
     
     def add_city(self, name, is_warehouse=False):
         """
@@ -72,9 +168,16 @@ class CityMap:
             City: The created or existing City object
         """
         if name not in self.cities:
+            # Interned names hash and compare faster in the many name-keyed
+            # lookups during planning
+            if isinstance(name, str):
+                name = sys.intern(name)
             city = City(name, is_warehouse)
             self.cities[name] = city
             self.routes[name] = {}
+            self._name_to_idx[name] = len(self._names)
+            self._names.append(name)
+            self.invalidate_path_cache()
             
             if is_warehouse:
                 self.warehouse = city
@@ -102,9 +205,55 @@ class CityMap:
         if city2_name not in self.cities:
             raise ValueError(f"City '{city2_name}' does not exist in the map")
         
+        # Key routes by the cities' own (interned) name strings
+        city1_name = self.cities[city1_name].name
+        city2_name = self.cities[city2_name].name
+        
         # Add bidirectional route
         self.routes[city1_name][city2_name] = distance
         self.routes[city2_name][city1_name] = distance
+        self.edges[self.edge_key(city1_name, city2_name)] = distance
+        self.invalidate_path_cache()
+    
+    def batch_add_routes(self, routes):
+        """
+        Add many bidirectional routes at once.
+        
+        Equivalent to calling add_route for each route, but the path caches
+        are invalidated once for the whole batch rather than once per route.
+        All cities are checked before any route is added, so a bad route
+        leaves the map unchanged.
+        
+        Args:
+            routes (iterable): (city1_name, city2_name, distance) tuples
+            
+        Raises:
+            ValueError: If any city does not exist in the map
+        """
+        routes = list(routes)
+        cities = self.cities
+        for city1_name, city2_name, _ in routes:
+            if city1_name not in cities:
+                raise ValueError(f"City '{city1_name}' does not exist in the map")
+            if city2_name not in cities:
+                raise ValueError(f"City '{city2_name}' does not exist in the map")
+        
+        if not routes:
+            return
+        
+        adjacency = self.routes
+        edges = self.edges
+        edge_key = self.edge_key
+        for city1_name, city2_name, distance in routes:
+            # Key routes by the cities' own (interned) name strings
+            city1_name = cities[city1_name].name
+            city2_name = cities[city2_name].name
+            
+            adjacency[city1_name][city2_name] = distance
+            adjacency[city2_name][city1_name] = distance
+            edges[edge_key(city1_name, city2_name)] = distance
+        
+        self.invalidate_path_cache()
     
     def get_neighbors(self, city_name):
         """
@@ -114,7 +263,7 @@ class CityMap:
             city_name (str): The name of the city
             
         Returns:
-            dict: Dictionary mapping neighbor city names to distances
+            Mapping: Read-only view mapping neighbor city names to distances
             
         Raises:
             ValueError: If the city does not exist in the map
@@ -122,16 +271,20 @@ class CityMap:
         if city_name not in self.cities:
             raise ValueError(f"City '{city_name}' does not exist in the map")
         
-        return self.routes[city_name]
+        # Read-only, so callers cannot change routes behind the path caches
+        return MappingProxyType(self.routes[city_name])
     
     def get_all_cities(self):
         """
         Get all cities in the map.
         
+        The result is a live view rather than a copy; call list() on it
+        to keep a snapshot while the map changes.
+        
         Returns:
-            list: List of all City objects
+            ValuesView: View of all City objects in insertion order
         """
-        return list(self.cities.values())
+        return self.cities.values()
     
     def get_warehouse_city(self):
         """
@@ -164,16 +317,36 @@ class CityMap:
         # Remove bidirectional route
         del self.routes[city1_name][city2_name]
         del self.routes[city2_name][city1_name]
+        del self.edges[self.edge_key(city1_name, city2_name)]
+        self.invalidate_path_cache()
+    
+    def copy(self):
+        """
+        Create an independent copy of the map's cities and routes.
+        
+        Cached shortest-path results are not copied; the copy builds its own.
+        
+        Returns:
+            CityMap: A new map with the same cities, warehouse and routes
+        """
+        city_map = CityMap()
+        for city in self.cities.values():
+            city_map.add_city(city.name, city.is_warehouse)
+        city_map.batch_add_routes(
+            (city1_name, city2_name, distance)
+            for (city1_name, city2_name), distance in self.edges.items()
+        )
+        return city_map
     
     def __str__(self):
         """String representation of the city map."""
-        result = "City Map:\n"
-        result += "Cities: " + ", ".join([str(city) for city in self.cities.values()]) + "\n"
-        result += "Routes:\n"
+        # Collect the lines and join once rather than growing a string
+        lines = ["City Map:", "Cities: " + ", ".join(map(str, self.cities.values())), "Routes:"]
         
         for city_name, neighbors in self.routes.items():
             if neighbors:
-                result += f"  {city_name} -> " + ", ".join([f"{neighbor}({distance})" 
-                                                         for neighbor, distance in neighbors.items()]) + "\n"
+                lines.append(f"  {city_name} -> " + ", ".join(f"{neighbor}({distance})"
+                                                             for neighbor, distance in neighbors.items()))
         
-        return result
+        lines.append("")
+        return "\n".join(lines)
@@ -14,6 +14,9 @@ class Drone:
         max_distance (float): Maximum flight distance per trip
     """
     
+    # Fixed attributes: smaller instances and faster attribute access
+    __slots__ = ('id', 'max_weight', 'max_distance')
+    
     def __init__(self, id, max_weight, max_distance):
         """
         Initialize a new Drone object.
@@ -4,6 +4,8 @@ Package model for Smart Drone Delivery Planner.
 This module defines the Package class for representing delivery packages.
 """
 
+import sys
+
 class Package:
     """
     Represents a package to be delivered.
@@ -15,6 +17,9 @@ class Package:
         destination (str): Name of the destination city
     """
     
+    # Fixed attributes: smaller instances and faster attribute access
+    __slots__ = ('id', 'weight', 'value', 'destination')
+    
     def __init__(self, id, weight, value, destination):
         """
         Initialize a new Package object.
@@ -28,7 +33,9 @@ class Package:
         self.id = id
         self.weight = weight
         self.value = value
-        self.destination = destination
+        # Interned names compare faster against city names; anything else is
+        # kept as given so validation can report it
+        self.destination = sys.intern(destination) if isinstance(destination, str) else destination
     
     def __str__(self):
         """String representation of the package."""
@@ -14,9 +14,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.city import City, CityMap
 from models.package import Package
 from models.drone import Drone
-from algorithms.shortest_path import get_shortest_path, get_all_shortest_paths
+from algorithms.shortest_path import (
+    get_shortest_path, get_all_shortest_paths, compute_all_pairs, get_distance_matrix,
+    _dijkstra_csr, _dijkstra_dial
+)
 from algorithms.package_selection import knapsack_package_selection
 from algorithms.route_planning import plan_route, get_detailed_route
+from algorithms.delivery_planning import plan_deliveries
+from utils.data_utils import validate_city_map, serialize_data, deserialize_routes
 
 
 class TestCityMap(unittest.TestCase):
@@ -67,6 +72,106 @@ class TestCityMap(unittest.TestCase):
         self.city_map.remove_route("A", "B")
         self.assertFalse("B" in self.city_map.routes["A"])
         self.assertFalse("A" in self.city_map.routes["B"])
+    
+    def test_edges(self):
+        """Test that each route is listed once under its sorted city pair."""
+        self.city_map.add_route("D", "B", 25)
+        self.assertEqual(len(self.city_map.edges), 5)
+        self.assertEqual(self.city_map.edges[("B", "D")], 25)
+        
+        self.city_map.remove_route("B", "D")
+        self.assertNotIn(("B", "D"), self.city_map.edges)
+    
+    def test_edge_key_mixed_names(self):
+        """Test that routes between names of different types share one key."""
+        self.city_map.add_city(7)
+        self.city_map.add_route("A", 7, 4)
+        self.city_map.batch_add_routes([(7, "A", 6)])
+        self.assertEqual(self.city_map.edges[CityMap.edge_key(7, "A")], 6)
+        self.assertEqual(len(self.city_map.edges), 5)
+        
+        self.city_map.remove_route(7, "A")
+        self.assertEqual(len(self.city_map.edges), 4)
+    
+    def test_batch_add_routes(self):
+        """Test adding several routes at once."""
+        version = self.city_map.version
+        self.city_map.batch_add_routes([("D", "B", 25), ("A", "C", 12)])
+        self.assertEqual(self.city_map.routes["B"]["D"], 25)
+        self.assertEqual(self.city_map.edges[("A", "C")], 12)
+        self.assertEqual(self.city_map.version, version + 1)
+        
+        # A missing city rejects the whole batch
+        with self.assertRaises(ValueError):
+            self.city_map.batch_add_routes([("A", "B", 5), ("A", "X", 5)])
+        self.assertEqual(self.city_map.routes["A"]["B"], 10)
+    
+    def test_build_csr(self):
+        """Test the compressed sparse row view of the routes."""
+        names, name_to_idx, indptr, indices, weights = self.city_map.build_csr()
+        self.assertEqual(names, ["A", "B", "C", "D"])
+        self.assertEqual(len(indptr), 5)
+        self.assertEqual(len(indices), 8)
+        
+        a = name_to_idx["A"]
+        neighbors = dict(zip(indices[indptr[a]:indptr[a+1]], weights[indptr[a]:indptr[a+1]]))
+        self.assertEqual(neighbors, {name_to_idx["B"]: 10, name_to_idx["D"]: 30})
+    
+    def test_validate_city_map(self):
+        """Test that maps with cities unreachable from the warehouse are rejected."""
+        self.assertEqual(validate_city_map(self.city_map), (True, ""))
+        
+        self.city_map.add_city("E")
+        self.assertEqual(
+            validate_city_map(self.city_map),
+            (False, "City 'E' is unreachable from warehouse")
+        )
+        
+        self.city_map.add_city("F")
+        self.city_map.add_route("E", "F", 5)
+        self.assertEqual(
+            validate_city_map(self.city_map),
+            (False, "2 cities unreachable from warehouse, including 'E'")
+        )
+    
+    def test_serialized_routes(self):
+        """Test that routes round-trip through the column-wise save layout."""
+        data = serialize_data(self.city_map, [], [])
+        self.assertEqual(data['format'], 2)
+        self.assertEqual(data['routes']['from_city'], ["A", "B", "C", "A"])
+        self.assertEqual(data['routes']['distance'], [10, 15, 20, 30])
+        self.assertEqual(
+            sorted(deserialize_routes(data)),
+            sorted((a, b, d) for (a, b), d in self.city_map.edges.items())
+        )
+        
+        # Files saved with one dictionary per route still load
+        legacy = {'routes': [{'from_city': "A", 'to_city': "B", 'distance': 10}]}
+        self.assertEqual(deserialize_routes(legacy), [("A", "B", 10)])
+        
+        with self.assertRaises(ValueError):
+            deserialize_routes({'format': 99, 'routes': []})
+        
+        # Columns of different lengths are rejected rather than truncated
+        with self.assertRaises(ValueError):
+            deserialize_routes({'format': 2, 'routes': {
+                'from_city': ["A", "B"], 'to_city': ["B", "C"], 'distance': [10]
+            }})
+    
+    def test_non_string_names(self):
+        """Test that cities and packages accept names that are not strings."""
+        self.city_map.add_city(7)
+        self.assertIn(7, self.city_map.cities)
+        self.assertEqual(Package(1, 1.0, 10, 7).destination, 7)
+    
+    def test_copy(self):
+        """Test that a copy has the same cities and routes but is independent."""
+        copy = self.city_map.copy()
+        self.assertEqual(copy.routes, self.city_map.routes)
+        self.assertEqual(copy.get_warehouse_city().name, "A")
+        
+        copy.remove_route("A", "B")
+        self.assertIn("B", self.city_map.routes["A"])
 
 
 class TestShortestPath(unittest.TestCase):
@@ -104,6 +209,80 @@ class TestShortestPath(unittest.TestCase):
         paths = get_all_shortest_paths(self.city_map, "A")
         self.assertEqual(len(paths), 5)  # A to all cities including itself
         self.assertEqual(paths["D"][1], 20)  # Distance from A to D
+    
+    def test_all_shortest_paths_from_distance_matrix(self):
+        """Test that paths from a city are read from the all-pairs matrices."""
+        get_distance_matrix(self.city_map)
+        paths = get_all_shortest_paths(self.city_map, "A")
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(paths["A"], (["A"], 0))
+        self.assertEqual(paths["D"], (["A", "E", "D"], 20))
+    
+    def test_shortest_path_after_route_change(self):
+        """Test that cached paths are invalidated when routes change."""
+        get_shortest_path(self.city_map, "A", "D")
+        self.city_map.remove_route("A", "E")
+        path, distance = get_shortest_path(self.city_map, "A", "D")
+        self.assertEqual(path, ["A", "B", "C", "D"])
+        self.assertEqual(distance, 45)
+    
+    def test_shortest_path_reverse_segment(self):
+        """Test that a cached segment is reused for the opposite direction."""
+        get_shortest_path(self.city_map, "A", "D")
+        path, distance = get_shortest_path(self.city_map, "D", "A")
+        self.assertEqual(path, ["D", "E", "A"])
+        self.assertEqual(distance, 20)
+    
+    def test_shortest_path_fractional_distances(self):
+        """Test that fractional route distances are handled exactly."""
+        self.city_map.add_route("A", "C", 24.5)
+        path, distance = get_shortest_path(self.city_map, "A", "C")
+        self.assertEqual(path, ["A", "C"])
+        self.assertEqual(distance, 24.5)
+    
+    def test_shortest_path_with_closed_route(self):
+        """Test that closed routes are avoided without changing the map."""
+        path, distance = get_shortest_path(self.city_map, "A", "D", closed_routes=[("E", "A")])
+        self.assertEqual(path, ["A", "B", "C", "D"])
+        self.assertEqual(distance, 45)
+        
+        path, distance = get_shortest_path(self.city_map, "A", "D")
+        self.assertEqual(path, ["A", "E", "D"])
+        self.assertEqual(distance, 20)
+    
+    def test_dial_matches_heap_search(self):
+        """Test that Dial's algorithm gives the same distances as the heap search."""
+        self.city_map.add_route("B", "D", 3.0)
+        self.city_map.add_route("C", "E", 7.0)
+        names, _, indptr, indices, weights = self.city_map.build_csr()
+        steps = [int(w) for w in weights]
+        
+        for start in range(len(names)):
+            expected, _ = _dijkstra_csr(indptr, indices, weights, start, len(names))
+            dist, pred = _dijkstra_dial(indptr, indices, weights, steps, start, len(names), max(steps))
+            self.assertEqual(dist, expected)
+            self.assertEqual([type(d) for d in dist], [type(d) for d in expected])
+            
+            # Every predecessor lies on a shortest path
+            for v, u in enumerate(pred):
+                if u >= 0:
+                    self.assertEqual(dist[v], dist[u] + self.city_map.routes[names[u]][names[v]])
+    
+    def test_compute_all_pairs(self):
+        """Test the all-pairs distance and next-hop matrices."""
+        dist, next_hop = compute_all_pairs(self.city_map)
+        self.assertEqual(dist[("A", "D")], 20)
+        self.assertEqual(dist[("D", "A")], 20)
+        self.assertEqual(dist[("B", "B")], 0)
+        self.assertEqual(next_hop[("A", "D")], "E")
+        self.assertEqual(next_hop[("E", "D")], "D")
+    
+    def test_shortest_path_from_all_pairs(self):
+        """Test that paths are read from the all-pairs matrices once computed."""
+        compute_all_pairs(self.city_map)
+        path, distance = get_shortest_path(self.city_map, "C", "E")
+        self.assertEqual(path, ["C", "B", "A", "E"])
+        self.assertEqual(distance, 30)
 
 
 class TestPackageSelection(unittest.TestCase):
@@ -145,6 +324,25 @@ class TestPackageSelection(unittest.TestCase):
         
         # Should only select packages for one city due to distance constraint
         self.assertTrue(all(p.destination == selected[0].destination for p in selected))
+    
+    def test_package_selection_never_exceeds_capacity(self):
+        """Test that weights between scale steps cannot overload the drone."""
+        packages = [Package(5, 5.04, 300, "City1")]
+        selected, value, weight, route = knapsack_package_selection(
+            packages, 5.0, self.city_map, 100, "Warehouse"
+        )
+        
+        self.assertEqual(selected, [])
+    
+    def test_package_selection_skips_overweight_packages(self):
+        """Test that a package too heavy for the drone does not block lighter ones."""
+        packages = [Package(5, 6.0, 600, "City1"), Package(6, 1.0, 50, "City1")]
+        selected, value, weight, route = knapsack_package_selection(
+            packages, 5.0, self.city_map, 100, "Warehouse"
+        )
+        
+        self.assertEqual([p.id for p in selected], [6])
+        self.assertEqual(value, 50)
 
 
 class TestRoutePlanning(unittest.TestCase):
@@ -175,6 +373,25 @@ class TestRoutePlanning(unittest.TestCase):
         self.assertEqual(len(route), 4)  # Warehouse -> City1 -> City2 -> Warehouse
         self.assertTrue(route[0] == "Warehouse" and route[-1] == "Warehouse")
     
+    def test_plan_route_optimal(self):
+        """Test that the shortest tour through all destinations is found."""
+        route, distance = plan_route(self.city_map, "Warehouse", ["City3", "City2", "City1"])
+        self.assertEqual(distance, 65)  # Warehouse -> City1 -> City2 -> City3 -> Warehouse
+        self.assertEqual(set(route[1:-1]), {"City1", "City2", "City3"})
+    
+    def test_plan_route_large_map(self):
+        """Test that routes on large maps only search from the route's cities."""
+        city_map = CityMap()
+        city_map.add_city("C0", True)
+        for i in range(1, 150):
+            city_map.add_city(f"C{i}")
+            city_map.add_route(f"C{i-1}", f"C{i}", 1)
+        
+        route, distance = plan_route(city_map, "C0", ["C10", "C5"])
+        self.assertEqual(route, ["C0", "C5", "C10", "C0"])
+        self.assertEqual(distance, 20)
+        self.assertIsNone(city_map._all_pairs_indexed)
+    
     def test_detailed_route(self):
         """Test getting a detailed route."""
         route = ["Warehouse", "City1", "City2", "Warehouse"]
@@ -185,5 +402,46 @@ class TestRoutePlanning(unittest.TestCase):
         self.assertEqual(total_distance, 10 + 15 + 25)  # W->C1 + C1->C2 + C2->W
 
 
+class TestDeliveryPlanning(unittest.TestCase):
+    """Test cases for planning trips across drones."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.city_map = CityMap()
+        self.city_map.add_city("Warehouse", True)
+        self.city_map.add_city("City1")
+        self.city_map.add_city("City2")
+        
+        self.city_map.add_route("Warehouse", "City1", 10)
+        self.city_map.add_route("City1", "City2", 10)
+        
+        self.packages = [
+            Package(1, 3.0, 100, "City1"),
+            Package(2, 3.0, 150, "City2"),
+            Package(3, 3.0, 50, "City2")
+        ]
+    
+    def test_plan_deliveries(self):
+        """Test that every package is delivered exactly once."""
+        plans, undelivered, errors = plan_deliveries(
+            self.city_map, self.packages, [Drone(1, 5.0, 100)], "Warehouse"
+        )
+        
+        delivered = [p.id for plan in plans for p in plan['packages']]
+        self.assertEqual(sorted(delivered), [1, 2, 3])
+        self.assertEqual(undelivered, [])
+        self.assertEqual(errors, [])
+        self.assertEqual(plans[0]['packages'], [self.packages[1]])
+    
+    def test_plan_deliveries_out_of_range(self):
+        """Test that packages beyond every drone's range stay undelivered."""
+        plans, undelivered, errors = plan_deliveries(
+            self.city_map, self.packages, [Drone(1, 10.0, 30)], "Warehouse"
+        )
+        
+        self.assertEqual([p.id for p in plans[0]['packages']], [1])
+        self.assertEqual(sorted(p.id for p in undelivered), [2, 3])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,6 +8,68 @@ and other helper functions.
 import json
 import os
 
+# Version of the data file layout written by serialize_data; files without
+# a 'format' key use the original layout (version 1)
+DATA_FORMAT = 2
+
+# orjson is optional; when installed it encodes and decodes much faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_json(data):
+    """
+    Encode data as compact JSON.
+    
+    Data files are written without indentation: the standard library only
+    uses its C encoder for unindented output, which is several times faster
+    and makes files about a third smaller.
+    
+    Args:
+        data: JSON-serializable data
+        
+    Returns:
+        bytes: UTF-8 encoded JSON text
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def decode_json(raw):
+    """
+    Decode JSON text.
+    
+    Args:
+        raw (bytes): UTF-8 encoded JSON text
+        
+    Returns:
+        The decoded data
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _first_duplicate(ids):
+    """
+    Find the first ID that occurs more than once.
+    
+    Args:
+        ids (list): IDs in their original order
+        
+    Returns:
+        The first repeated ID, or None if all IDs are unique
+    """
+    seen = set()
+    for item_id in ids:
+        if item_id in seen:
+            return item_id
+        seen.add(item_id)
+    return None
+
 
 def validate_city_map(city_map):
     """
@@ -27,15 +89,36 @@ def validate_city_map(city_map):
     if not city_map.get_warehouse_city():
         return False, "City map must contain a warehouse city"
     
-    # Check if all cities are connected
-    warehouse = city_map.get_warehouse_city()
-    if not warehouse:
-        return False, "No warehouse city defined"
+    # Check that only one city is marked as the warehouse
+    if sum(city.is_warehouse for city in city_map.cities.values()) > 1:
+        return False, "City map must contain only one warehouse city"
     
     # Check if there are any routes
     if not any(city_map.routes.values()):
         return False, "City map must contain at least one route"
     
+    # Check if all cities are connected: search outward from the warehouse
+    # over the flat adjacency lists and count the cities never reached
+    names, name_to_idx, indptr, indices, _ = city_map.build_csr()
+    start = name_to_idx[city_map.get_warehouse_city().name]
+    visited = [False] * len(names)
+    visited[start] = True
+    stack = [start]
+    while stack:
+        u = stack.pop()
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            if not visited[v]:
+                visited[v] = True
+                stack.append(v)
+    
+    unreachable = visited.count(False)
+    if unreachable:
+        # Name the first unreachable city, so the missing route can be found
+        first = names[visited.index(False)]
+        if unreachable == 1:
+            return False, f"City '{first}' is unreachable from warehouse"
+        return False, f"{unreachable} cities unreachable from warehouse, including '{first}'"
+    
     return True, ""
 
 
@@ -54,9 +137,10 @@ def validate_packages(packages):
         return False, "There must be at least one package"
     
     # Check for duplicate IDs
+    # Building the set runs in C; the duplicate is only located on failure
     ids = [p.id for p in packages]
     if len(ids) != len(set(ids)):
-        return False, "Package IDs must be unique"
+        return False, f"Package IDs must be unique (duplicate ID: {_first_duplicate(ids)})"
     
     # Check for valid weights and values
     for package in packages:
@@ -83,9 +167,10 @@ def validate_drones(drones):
         return False, "There must be at least one drone"
     
     # Check for duplicate IDs
+    # Building the set runs in C; the duplicate is only located on failure
     ids = [d.id for d in drones]
     if len(ids) != len(set(ids)):
-        return False, "Drone IDs must be unique"
+        return False, f"Drone IDs must be unique (duplicate ID: {_first_duplicate(ids)})"
     
     # Check for valid capacities
     for drone in drones:
@@ -97,6 +182,103 @@ def validate_drones(drones):
     return True, ""
 
 
+def serialize_data(city_map, packages, drones):
+    """
+    Convert the planner's data to JSON-serializable structures.
+    
+    Routes are stored column-wise, as three parallel lists of city names
+    and distances, rather than as one small dictionary per route. The
+    'format' key records this layout (see DATA_FORMAT).
+    
+    Args:
+        city_map (CityMap): The city map to save
+        packages (list): List of Package objects to save
+        drones (list): List of Drone objects to save
+        
+    Returns:
+        dict: Data with the 'format' version, 'cities', 'packages' and
+              'drones' lists and a 'routes' dictionary of 'from_city',
+              'to_city' and 'distance' lists
+    """
+    edges = city_map.edges
+    
+    return {
+        'format': DATA_FORMAT,
+        'cities': [
+            {
+                'name': city.name,
+                'is_warehouse': city.is_warehouse
+            }
+            for city in city_map.cities.values()
+        ],
+        'routes': {
+            'from_city': [city1 for city1, _ in edges],
+            'to_city': [city2 for _, city2 in edges],
+            'distance': list(edges.values())
+        },
+        'packages': [
+            {
+                'id': package.id,
+                'weight': package.weight,
+                'value': package.value,
+                'destination': package.destination
+            }
+            for package in packages
+        ],
+        'drones': [
+            {
+                'id': drone.id,
+                'max_weight': drone.max_weight,
+                'max_distance': drone.max_distance
+            }
+            for drone in drones
+        ]
+    }
+
+
+def deserialize_routes(data):
+    """
+    Read the routes from loaded data.
+    
+    Accepts both the column-wise layout written by serialize_data (format 2)
+    and the original list with one dictionary per route (format 1).
+    
+    Args:
+        data (dict): Decoded data file contents
+        
+    Returns:
+        list: (city1_name, city2_name, distance) tuples
+        
+    Raises:
+        ValueError: If the file uses an unknown format or its route columns
+                    differ in length
+    """
+    data_format = data.get('format', 1)
+    
+    if data_format == 1:
+        return [
+            (route_data['from_city'], route_data['to_city'], route_data['distance'])
+            for route_data in data.get('routes', [])
+        ]
+    
+    if data_format == 2:
+        routes = data.get('routes', {})
+        from_cities = routes.get('from_city', [])
+        to_cities = routes.get('to_city', [])
+        distances = routes.get('distance', [])
+        
+        # zip() would silently drop the routes of a longer column
+        if not len(from_cities) == len(to_cities) == len(distances):
+            raise ValueError(
+                f"Route columns differ in length: {len(from_cities)} from_city, "
+                f"{len(to_cities)} to_city, {len(distances)} distance"
+            )
+        
+        return list(zip(from_cities, to_cities, distances))
+    
+    raise ValueError(f"Unsupported data file format: {data_format}")
+
+
 def save_data_to_file(filename, city_map, packages, drones):
     """
     Save data to a JSON file.
@@ -111,46 +293,10 @@ def save_data_to_file(filename, city_map, packages, drones):
         bool: True if successful, False otherwise
     """
     try:
-        # Prepare data
-        data = {
-            'cities': [
-                {
-                    'name': city.name,
-                    'is_warehouse': city.is_warehouse
-                }
-                for city in city_map.get_all_cities()
-            ],
-            'routes': [
-                {
-                    'from_city': city_name,
-                    'to_city': neighbor,
-                    'distance': distance
-                }
-                for city_name, neighbors in city_map.routes.items()
-                for neighbor, distance in neighbors.items()
-                if city_name < neighbor  # Only include each route once
-            ],
-            'packages': [
-                {
-                    'id': package.id,
-                    'weight': package.weight,
-                    'value': package.value,
-                    'destination': package.destination
-                }
-                for package in packages
-            ],
-            'drones': [
-                {
-                    'id': drone.id,
-                    'max_weight': drone.max_weight,
-                    'max_distance': drone.max_distance
-                }
-                for drone in drones
-            ]
-        }
-        
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Encode before opening the file, so a failure leaves it untouched
+        payload = encode_json(serialize_data(city_map, packages, drones))
+        with open(filename, 'wb') as f:
+            f.write(payload)
         
         return True
     except Exception:
@@ -172,8 +318,8 @@ def load_data_from_file(filename):
     from models.drone import Drone
     
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        with open(filename, 'rb') as f:
+            data = decode_json(f.read())
         
         # Create city map
         city_map = CityMap()
@@ -183,12 +329,7 @@ def load_data_from_file(filename):
             city_map.add_city(city_data['name'], city_data.get('is_warehouse', False))
         
         # Load routes
-        for route_data in data.get('routes', []):
-            city_map.add_route(
-                route_data['from_city'],
-                route_data['to_city'],
-                route_data['distance']
-            )
+        city_map.batch_add_routes(deserialize_routes(data))
         
         # Load packages
         packages = []